@@ -0,0 +1,297 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from math import isqrt
+
+from solver import (ProcessGraph, load_instance, count_critical_paths, iter_critical_paths, maximum_on_time,
+                    minimal_with_lag_for_dependent, amount_with_oddity, maximal_t_for_N_processes_on_T,
+                    minimal_t_for_all_on_T, solve_peak, find_horizon, presolve, maximize_peak_duration,
+                    build_time_model, add_time_peak_duration, build_events_model, add_events_peak_duration,
+                    exact_peak, maximize_peak_parallelism)
+
+
+# Генераторы синтетических вариантов. Каждый возвращает словарь процессов в формате solver.py
+# {id: [id, длительность, зависимости, 0, 0]} с id 1..n; durations — диапазон длительностей,
+# rng — random.Random, чтобы вариант однозначно задавался параметрами и seed
+
+# Слоистый граф: процессы поровну распределены по слоям, каждый процесс слоя зависит
+# от 1..max_deps процессов предыдущего слоя. Слоёв не больше sqrt(n), чтобы малый граф
+# не вырождался в цепочку из слоёв по одному процессу
+def layered_dag(n, rng, durations=(1, 10), layers=10, max_deps=3):
+    processes = dict()
+    layers = max(1, min(layers, isqrt(n)))
+    size = max(1, -(-n // layers))
+    for i in range(1, n + 1):
+        layer = (i - 1) // size
+        previous = range(max(1, (layer - 1) * size + 1), layer * size + 1)
+        deps = rng.sample(previous, min(len(previous), rng.randint(1, max_deps))) if layer else []
+        processes[i] = [i, rng.randint(*durations), tuple(sorted(deps)), 0, 0]
+    return processes
+
+
+# Граф из длинных цепочек: процесс зависит от предыдущего в своей цепочке и с вероятностью
+# cross — ещё от случайного более раннего процесса
+def chain_dag(n, rng, durations=(1, 10), chains=4, cross=0.05):
+    processes = dict()
+    for i in range(1, n + 1):
+        deps = {i - chains} if i > chains else set()
+        if i > 1 and rng.random() < cross:
+            deps.add(rng.randrange(1, i))
+        processes[i] = [i, rng.randint(*durations), tuple(sorted(deps)), 0, 0]
+    return processes
+
+
+# Граф с широкими слияниями: блоки по fan_in процессов, каждый блок начинается после
+# завершающего процесса предыдущего блока, а завершающий процесс ждёт весь свой блок
+def fan_in_dag(n, rng, durations=(1, 10), fan_in=50):
+    processes = dict()
+    collector = None
+    block = []
+    for i in range(1, n + 1):
+        if len(block) == fan_in or i == n and block:
+            deps = tuple(block)
+            collector = i
+            block = []
+        else:
+            deps = (collector,) if collector else ()
+            block.append(i)
+        processes[i] = [i, rng.randint(*durations), deps, 0, 0]
+    return processes
+
+
+# Случайный граф: процесс зависит от 0..2 * degree случайных более ранних процессов
+def random_dag(n, rng, durations=(1, 10), degree=2):
+    processes = dict()
+    for i in range(1, n + 1):
+        deps = rng.sample(range(1, i), min(i - 1, rng.randint(0, 2 * degree)))
+        processes[i] = [i, rng.randint(*durations), tuple(sorted(deps)), 0, 0]
+    return processes
+
+
+GENERATORS = {
+    'layered': layered_dag,
+    'chain': chain_dag,
+    'fan_in': fan_in_dag,
+    'random': random_dag,
+}
+
+
+# Вариант для задач 6, 8, 9: длительность случайного процесса становится неизвестной (t)
+def with_placeholder(processes, rng):
+    processes = dict(processes)
+    t_id = rng.choice(sorted(processes))
+    t_row = processes.pop(t_id)
+    return processes, [t_id, 0, t_row[2], 0, 0]
+
+
+# Запись варианта в текстовый файл в формате, который читает load_instance
+def write_instance(filename, processes, t_row=None):
+    rows = list(processes.values()) + ([t_row] if t_row else [])
+    with open(filename, 'w', encoding='utf-8') as f:
+        for row_id, duration, deps, _, _ in sorted(rows):
+            duration = 't' if t_row and row_id == t_row[0] else duration
+            f.write(f"{row_id}\t{duration}\t{';'.join(map(str, deps)) or 0}\n")
+
+
+# Лучшее из repeat измерений: (время в секундах, результат последнего вызова)
+def measure(function, repeat=1):
+    best = None
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - begin
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+
+# Версия кода, для которой сняты замеры (коммит git, если он доступен)
+def code_version():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Задачи без MILP: загрузка файла, критический путь (задача 2), 4, 5, 7 и поиск t (6, 8, 9)
+def bench_graph_tasks(processes, rng, repeat):
+    records = []
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'instance.txt')
+        write_instance(filename, processes)
+        seconds, graph = measure(lambda: load_instance(filename), repeat)
+        records.append({'task': 'load', 'seconds': seconds, 'result': len(graph.ids)})
+        load_instance(filename, cache=True)
+        seconds, _ = measure(lambda: load_instance(filename, cache=True), repeat)
+        records.append({'task': 'load_cached', 'seconds': seconds, 'result': len(graph.ids)})
+
+    # Задача 2: построение графа, число критичных цепочек и первые 100 из них
+    def critical_paths():
+        built = ProcessGraph(processes)
+        return [built.makespan, count_critical_paths(built), sum(1 for _ in iter_critical_paths(built, 100))]
+
+    half = graph.makespan // 2
+    tasks = [
+        (2, critical_paths),
+        (4, lambda: maximum_on_time(graph, half)),
+        (5, lambda: minimal_with_lag_for_dependent(graph, 3)),
+        (7, lambda: amount_with_oddity(graph, 1)),
+    ]
+    t_processes, t_row = with_placeholder(processes, rng)
+    t_graph = ProcessGraph({**t_processes, t_row[0]: t_row}, t_row[0])
+    T, n = graph.makespan + 10, len(t_processes)
+    tasks += [
+        (6, lambda: maximal_t_for_N_processes_on_T(t_graph, n // 2, T)),
+        (8, lambda: minimal_t_for_all_on_T(t_graph, T)),
+        (9, lambda: maximal_t_for_N_processes_on_T(t_graph, n + 1, T)),
+    ]
+    for task, function in tasks:
+        seconds, result = measure(function, repeat)
+        records.append({'task': task, 'seconds': seconds, 'result': result})
+    return records
+
+
+# Задачи с MILP (1, 3, 10) для обеих моделей и пик: exact_peak и перепроверка MILP
+def bench_milp_tasks(processes, time_budget):
+    records = []
+    graph = ProcessGraph(processes)
+    makespan = graph.makespan
+    seconds, result = measure(lambda: exact_peak(graph, makespan))
+    records.append({'task': 'peak', 'formulation': 'antichain', 'seconds': seconds, 'result': result[0]})
+    for formulation in ('time', 'events'):
+        seconds, result = measure(lambda: maximize_peak_parallelism(processes, makespan, formulation,
+                                                                    time_budget=time_budget, graph=graph))
+        records.append({'task': 'peak', 'formulation': formulation, 'seconds': seconds, 'result': result})
+        tasks = [
+            (1, lambda: solve_peak(processes, makespan, formulation, time_budget=time_budget, graph=graph)),
+            (3, lambda: find_horizon(processes, formulation, 2, time_budget=time_budget, graph=graph)),
+            (10, lambda: find_horizon(processes, formulation, time_budget=time_budget, graph=graph)),
+        ]
+        for task, function in tasks:
+            seconds, result = measure(function)
+            if isinstance(result, dict):
+                result = [result['peak'], result['duration'], result['horizon'], result['certified']]
+            else:
+                result = [result[0], result[2]]
+            records.append({'task': task, 'formulation': formulation, 'seconds': seconds, 'result': result})
+    return records
+
+
+# Размер модели длительности пика (второй этап) на горизонте horizon
+def model_size(processes, graph, horizon, formulation, windows, peak):
+    if formulation == 'events':
+        prob, s, peak_start, y = build_events_model('Size', processes, horizon, windows, graph.ancestors())
+        add_events_peak_duration(prob, s, peak_start, y, processes, horizon, peak, windows, graph.ancestors())
+    else:
+        prob, _, active, _ = build_time_model('Size', processes, horizon, windows)
+        add_time_peak_duration(prob, active, horizon, peak)
+    return len(prob.variables()), len(prob.constraints)
+
+
+# Пик (exact_peak) и его длительность (MILP) при горизонте horizon без масштабирования шкалы
+def peak_with_duration(processes, graph, horizon, formulation, windows, time_budget):
+    peak = exact_peak(graph, horizon)[0]
+    _, duration, _ = maximize_peak_duration(processes, horizon, peak, formulation, windows,
+                                            time_budget=time_budget, graph=graph)
+    return peak, duration
+
+
+# Рост модели и времени решения с горизонтом: для каждого коэффициента из steps
+# горизонт равен длине критического пути, умноженной на коэффициент (без масштабирования шкалы)
+def bench_horizon(processes, steps, time_budget):
+    records = []
+    graph = ProcessGraph(processes)
+    for step in steps:
+        horizon = int(graph.makespan * step)
+        windows, _ = presolve(graph, horizon)
+        for formulation in ('time', 'events'):
+            seconds, (peak, duration) = measure(lambda: peak_with_duration(
+                processes, graph, horizon, formulation, windows, time_budget))
+            variables, constraints = model_size(processes, graph, horizon, formulation, windows, peak or 0)
+            records.append({'task': 'horizon', 'formulation': formulation, 'horizon': horizon, 'step': step,
+                            'seconds': seconds, 'variables': variables, 'constraints': constraints,
+                            'result': [peak, duration]})
+    return records
+
+
+# Ключ замера для сравнения запусков разных версий
+def record_key(record):
+    return tuple(record.get(field) for field in ('generator', 'n', 'seed', 'task', 'formulation', 'step'))
+
+
+# Сравнение с замерами предыдущей версии: замедление больше threshold раз и несовпадение
+# ответов выводятся в stderr. Возвращает число найденных проблем
+def compare(records, baseline_file, threshold):
+    with open(baseline_file, encoding='utf-8') as f:
+        baseline = {record_key(record): record for record in map(json.loads, f) if record}
+    problems = 0
+    for record in records:
+        old = baseline.get(record_key(record))
+        if old is None:
+            continue
+        name = ' '.join(str(field) for field in record_key(record) if field is not None)
+        ratio = record['seconds'] / max(old['seconds'], 1e-6)
+        if old.get('result') != record.get('result'):
+            print(f'ОТВЕТ ИЗМЕНИЛСЯ {name}: {old.get("result")} -> {record.get("result")}', file=sys.stderr)
+            problems += 1
+        if ratio > threshold and record['seconds'] > 0.01:
+            print(f'ЗАМЕДЛЕНИЕ {name}: {old["seconds"]:.4f} -> {record["seconds"]:.4f} с (x{ratio:.2f})',
+                  file=sys.stderr)
+            problems += 1
+    return problems
+
+
+# Все замеры: задачи без MILP на графах размеров sizes, задачи с MILP и рост модели
+# с горизонтом на графах размеров milp_sizes. Возвращает записи по мере готовности
+def run_benchmarks(generators, sizes, milp_sizes, steps, seed=0, repeat=3, time_budget=60):
+    version = code_version()
+    for generator in generators:
+        for n, kind in [(n, 'graph') for n in sizes] + [(n, 'milp') for n in milp_sizes]:
+            rng = random.Random(f'{generator}-{n}-{seed}')
+            processes = GENERATORS[generator](n, rng)
+            if kind == 'graph':
+                records = bench_graph_tasks(processes, rng, repeat)
+            else:
+                records = bench_milp_tasks(processes, time_budget) + bench_horizon(processes, steps, time_budget)
+            for record in records:
+                yield {'version': version, 'generator': generator, 'n': n, 'seed': seed, **record}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Замеры производительности solver.py на синтетических графах')
+    parser.add_argument('--generators', nargs='+', choices=sorted(GENERATORS), default=sorted(GENERATORS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000],
+                        help='число процессов для задач без MILP')
+    parser.add_argument('--milp-sizes', nargs='+', type=int, default=[8, 12],
+                        help='число процессов для задач 1, 3, 10 и роста модели с горизонтом')
+    parser.add_argument('--steps', nargs='+', type=float, default=[1, 1.5, 2, 3],
+                        help='горизонты в долях длины критического пути')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='повторы быстрых замеров (берётся лучший)')
+    parser.add_argument('--time-budget', type=float, default=60, help='ограничение времени CBC, с')
+    parser.add_argument('--output', default=None, help='файл JSON Lines для замеров (по умолчанию stdout)')
+    parser.add_argument('--compare', metavar='BASELINE', help='замеры предыдущей версии для сравнения')
+    parser.add_argument('--threshold', type=float, default=1.25, help='допустимое замедление, раз')
+    args = parser.parse_args()
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    records = []
+    try:
+        for record in run_benchmarks(args.generators, args.sizes, args.milp_sizes, args.steps,
+                                     args.seed, args.repeat, args.time_budget):
+            records.append(record)
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if args.compare and compare(records, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
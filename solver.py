@@ -1,359 +1,1642 @@
-import networkx as nx
-from pulp import LpProblem, LpVariable, lpSum, LpMaximize, LpInteger, LpBinary, PULP_CBC_CMD, LpStatus, value
-from pprint import pprint
+import csv
+import hashlib
+import json
+import os
+import re
+import signal
+import sys
+import time
+import tracemalloc
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager, nullcontext
+from functools import partial, reduce
+from math import gcd
+
+
+# Граф процессов, построенный один раз для файла и общий для всех типов задач.
+# Процессы пронумерованы по возрастанию id, зависимости хранятся в виде CSR
+# (pred_ptr/pred_idx — предшественники, succ_ptr/succ_idx — последователи),
+# длительности, ранние начала и окончания — в непрерывных массивах.
+# placeholder — id процесса с неизвестной длительностью t (в графе его длительность 0)
+class ProcessGraph:
+    MAGIC = b'S22G\x02'
+
+    def __init__(self, processes: dict, placeholder=None):
+        self.ids = sorted(processes.keys())
+        self.index = {p: k for k, p in enumerate(self.ids)}
+        self.placeholder = placeholder
+        self.durations = array('q', (processes[p][1] for p in self.ids))
+        self.pred_ptr = array('q', [0])
+        self.pred_idx = array('q')
+        for p in self.ids:
+            for dep in processes[p][2]:
+                self.pred_idx.append(self.index[dep])
+            self.pred_ptr.append(len(self.pred_idx))
+        self._link()
+
+    # Последователи, топологический порядок и ранние сроки по уже заполненным предшественникам
+    def _link(self):
+        n = len(self.ids)
+        succ_count = array('q', [0]) * (n + 1)
+        for j in self.pred_idx:
+            succ_count[j + 1] += 1
+        for v in range(n):
+            succ_count[v + 1] += succ_count[v]
+        self.succ_ptr = array('q', succ_count)
+        self.succ_idx = array('q', [0]) * len(self.pred_idx)
+        for v in range(n):
+            for k in range(self.pred_ptr[v], self.pred_ptr[v + 1]):
+                j = self.pred_idx[k]
+                self.succ_idx[succ_count[j]] = v
+                succ_count[j] += 1
+        self.order = self._topological_order()
+        self.update()
+
+    # Сохранение в компактном двоичном виде: повторный анализ большого файла не требует разбора.
+    # Файл записывается во временный и заменяет прежний целиком, поэтому читающий его
+    # одновременно процесс не увидит недописанный граф
+    def save(self, filename):
+        import tempfile
+        placeholder = self.index[self.placeholder] if self.placeholder is not None else -1
+        handle, temporary = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(filename)))
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                f.write(self.MAGIC)
+                array('q', [len(self.ids), len(self.pred_idx), placeholder]).tofile(f)
+                for values in (array('q', self.ids), self.durations, self.pred_ptr, self.pred_idx,
+                               self.succ_ptr, self.succ_idx, self.order):
+                    values.tofile(f)
+            os.replace(temporary, filename)
+        except BaseException:
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, filename):
+        graph = cls.__new__(cls)
+        with open(filename, 'rb') as f:
+            if f.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f'{filename}: не файл скомпилированного графа процессов')
+            header = array('q')
+            fields = dict()
+            try:
+                header.fromfile(f, 3)
+                n, m, placeholder = header
+                for name, size in (('ids', n), ('durations', n), ('pred_ptr', n + 1), ('pred_idx', m),
+                                   ('succ_ptr', n + 1), ('succ_idx', m), ('order', n)):
+                    fields[name] = array('q')
+                    fields[name].fromfile(f, size)
+            except (EOFError, ValueError, MemoryError):
+                raise ValueError(f'{filename}: файл скомпилированного графа повреждён или обрезан')
+        graph.__dict__.update(fields)
+        graph.ids = graph.ids.tolist()
+        graph.index = {p: k for k, p in enumerate(graph.ids)}
+        graph.placeholder = graph.ids[placeholder] if placeholder >= 0 else None
+        graph.update()
+        return graph
+
+    # Словарь процессов в формате [id, длительность, зависимости, 0, 0] и отдельно строка
+    # процесса с неизвестной длительностью (None, если его нет)
+    def to_processes(self):
+        processes = dict()
+        t_row = None
+        for v, p in enumerate(self.ids):
+            deps = tuple(self.ids[j] for j in self.pred_idx[self.pred_ptr[v]:self.pred_ptr[v + 1]])
+            if p == self.placeholder:
+                t_row = [p, 0, deps, 0, 0]
+            else:
+                processes[p] = [p, self.durations[v], deps, 0, 0]
+        return processes, t_row
+
+    # Топологический порядок (алгоритм Кана), при цикле в зависимостях — ValueError
+    def _topological_order(self):
+        n = len(self.ids)
+        in_degree = array('q', (self.pred_ptr[v + 1] - self.pred_ptr[v] for v in range(n)))
+        order = array('q', (v for v in range(n) if in_degree[v] == 0))
+        head = 0
+        while head < len(order):
+            v = order[head]
+            head += 1
+            for k in range(self.succ_ptr[v], self.succ_ptr[v + 1]):
+                w = self.succ_idx[k]
+                in_degree[w] -= 1
+                if in_degree[w] == 0:
+                    order.append(w)
+        if len(order) != n:
+            cycle = sorted(self.ids[v] for v in range(n) if in_degree[v] > 0)
+            raise ValueError(f'Зависимости процессов содержат цикл (не упорядочены процессы {", ".join(map(str, cycle))})')
+        return order
+
+    # Пересчёт ранних начал и окончаний после изменения длительностей
+    def update(self):
+        self.starts, self.finishes = self.forward()
+        self.makespan = max(self.finishes, default=0)
+
+    # Тот же граф с длительностями durations (в порядке ids): зависимости и вычисленные
+    # по ним данные (топологический порядок, множества предков) общие с исходным графом
+    def with_durations(self, durations):
+        graph = self.__class__.__new__(self.__class__)
+        graph.__dict__.update(self.__dict__)
+        graph.durations = array('q', durations)
+        graph.update()
+        return graph
+
+    # Множества id предков каждого процесса по id (нужны событийной модели, чтобы
+    # не создавать заведомо невозможные перекрытия); вычисляются один раз для графа
+    def ancestors(self):
+        if getattr(self, '_ancestors', None) is None:
+            ancestors = dict()
+            for v in self.order:
+                found = set()
+                for k in range(self.pred_ptr[v], self.pred_ptr[v + 1]):
+                    pred = self.ids[self.pred_idx[k]]
+                    found.add(pred)
+                    found |= ancestors[pred]
+                ancestors[self.ids[v]] = found
+            self._ancestors = ancestors
+        return self._ancestors
+
+    # Прямой проход: ранние начала и окончания; lag — задержка перед зависимым процессом
+    def forward(self, lag=0):
+        n = len(self.ids)
+        durations, pred_ptr, pred_idx = self.durations, self.pred_ptr, self.pred_idx
+        starts = array('q', [0]) * n
+        finishes = array('q', [0]) * n
+        for v in self.order:
+            start = 0
+            for k in range(pred_ptr[v], pred_ptr[v + 1]):
+                finish = finishes[pred_idx[k]]
+                if finish > start:
+                    start = finish
+            if lag and start:
+                start += lag
+            starts[v] = start
+            finishes[v] = start + durations[v]
+        return starts, finishes
+
+    # Топологические слои: в слое k — процессы, до которых самая длинная цепочка
+    # зависимостей состоит из k процессов; процессы одного слоя друг от друга не зависят
+    def layers(self):
+        pred_ptr, pred_idx = self.pred_ptr, self.pred_idx
+        level = array('q', [0]) * len(self.ids)
+        for v in self.order:
+            for k in range(pred_ptr[v], pred_ptr[v + 1]):
+                if level[pred_idx[k]] >= level[v]:
+                    level[v] = level[pred_idx[k]] + 1
+        groups = [array('q') for _ in range(max(level, default=-1) + 1)]
+        for v, k in enumerate(level):
+            groups[k].append(v)
+        return groups
+
+    # Обратный проход: самое позднее окончание каждого процесса, при котором
+    # все процессы завершатся за time_limit
+    def latest_finishes(self, time_limit):
+        durations, succ_ptr, succ_idx = self.durations, self.succ_ptr, self.succ_idx
+        latest = array('q', [time_limit]) * len(self.ids)
+        for v in reversed(self.order):
+            finish = time_limit
+            for k in range(succ_ptr[v], succ_ptr[v + 1]):
+                w = succ_idx[k]
+                if latest[w] - durations[w] < finish:
+                    finish = latest[w] - durations[w]
+            latest[v] = finish
+        return latest
+
+    # Резерв времени каждого процесса при ограничении time_limit
+    def slack(self, time_limit):
+        latest = self.latest_finishes(time_limit)
+        return array('q', (latest[v] - self.finishes[v] for v in range(len(self.ids))))
+
+    # Самый длинный путь от окончания процесса source до окончания каждого его потомка
+    # (словарь индекс -> длина, сам source входит с длиной 0)
+    def descendant_distances(self, source):
+        durations, pred_ptr, pred_idx = self.durations, self.pred_ptr, self.pred_idx
+        distances = {source: 0}
+        for v in self.order:
+            for k in range(pred_ptr[v], pred_ptr[v + 1]):
+                pred = pred_idx[k]
+                if pred in distances and distances[pred] + durations[v] > distances.get(v, -1):
+                    distances[v] = distances[pred] + durations[v]
+        return distances
+
+
+# Предшественники процесса v, лежащие на самом длинном пути к нему
+def tight_predecessors(graph: ProcessGraph, v):
+    durations, finishes = graph.durations, graph.finishes
+    return [pred for pred in graph.pred_idx[graph.pred_ptr[v]:graph.pred_ptr[v + 1]]
+            if finishes[pred] + durations[v] == finishes[v]]
+
+
+# Количество критичных цепочек без их перечисления: число самых длинных путей,
+# оканчивающихся в каждом процессе, складывается по топологическому порядку
+def count_critical_paths(graph: ProcessGraph):
+    ways = [0] * len(graph.ids)
+    for v in graph.order:
+        ways[v] = sum(ways[pred] for pred in tight_predecessors(graph, v)) or 1
+    return sum(ways[v] for v, finish in enumerate(graph.finishes) if finish == graph.makespan)
+
+
+# Ленивый перебор критичных цепочек (от последнего процесса к первому) без рекурсии;
+# limit — максимальное число выдаваемых цепочек
+def iter_critical_paths(graph: ProcessGraph, limit=None):
+    found = 0
+    for end, finish in enumerate(graph.finishes):
+        if finish != graph.makespan:
+            continue
+        path = [end]
+        stack = [iter(tight_predecessors(graph, end))]
+        while stack:
+            v = path[-1]
+            if graph.pred_ptr[v] == graph.pred_ptr[v + 1]:
+                yield [graph.ids[u] for u in path]
+                found += 1
+                if limit is not None and found >= limit:
+                    return
+                pred = None
+            else:
+                pred = next(stack[-1], None)
+            if pred is None:
+                stack.pop()
+                path.pop()
+            else:
+                path.append(pred)
+                stack.append(iter(tight_predecessors(graph, pred)))
 
 
 # Нахождение критичных цепочек процессов и вычисление минимально возможного времени выполнения всех процессов
-def find_all_critical_paths(processes: dict):
-    G = nx.DiGraph()
-    procs = sorted(processes.keys())
-    G.add_nodes_from(procs)
-    for i in procs:
-        dependencies = processes[i][2]
-        if dependencies:
-            G.add_edges_from([(dep, i) for dep in dependencies])
-    sorted_processes = nx.topological_sort(G)
-    for process in processes:
-        processes[process][3] = 0
-        processes[process][4] = 0
-    paths = {process: [] for process in processes}
-    # Расчёт времени выполнения для каждого процесса
-    for process in sorted_processes:
-        duration = processes[process][1]
-        max_preceding_time = max((processes[pred][4] for pred in
-                                  processes[process][2]), default=0)
-        processes[process][3] = max_preceding_time
-        processes[process][4] = duration + max_preceding_time
-        # Обновление путей
-        for pred in processes[process][2]:
-            if processes[pred][4] + duration == processes[process][4]:
-                paths[process].append(pred)
-    # Определение всех максимальных путей
-    max_time = max(processes[p][4] for p in processes)
-    critical_paths = []
-    for process, time in processes.items():
-        if processes[process][4] == max_time:
-            critical_paths.extend(find_paths(process, paths))
-    return critical_paths, max_time
-
-
-# Вспомогательная функция которая нужна для работы предыдущей
-def find_paths(process, paths):
-    if not paths[process]:
-        return [[process]]
-    subpaths = []
-    for pred in paths[process]:
-        subpaths.extend(find_paths(pred, paths))
-    return [[process] + path for path in subpaths]
+def find_all_critical_paths(graph: ProcessGraph, limit=None):
+    return list(iter_critical_paths(graph, limit)), graph.makespan
 
 
 # Нахождение максимально возможных задержек для процессов без нарушения лимита времени
-def find_max_lags(processes: dict, forbidden_processes: set, time_limit):
-    G = nx.DiGraph()
-    procs = sorted(processes.keys())
-    G.add_nodes_from(procs)
-    for i in procs:
-        dependencies = processes[i][2]
-        if dependencies:
-            G.add_edges_from([(dep, i) for dep in dependencies])
-    sorted_processes = list(nx.topological_sort(G))
+def find_max_lags(graph: ProcessGraph, forbidden_processes: set, time_limit):
+    last_times = graph.latest_finishes(time_limit)
     lags = dict()
-    last_times = dict()
-    for p in sorted_processes[::-1]:
-        next_processes = list(G.successors(p))
-        if next_processes:
-            last_time = min(last_times[p] - processes[p][1] for p in next_processes)
-        else:
-            last_time = time_limit
-        last_times[p] = last_time
-    for p in sorted_processes:
+    for v in graph.order:
+        p = graph.ids[v]
         if p not in forbidden_processes:
-            prev_proc = list(G.predecessors(p))
-            lag = last_times[p] - processes[p][1]
-            if prev_proc:
-                lag -= max(last_times[p] for p in prev_proc)
+            lag = last_times[v] - graph.durations[v]
+            preds = graph.pred_idx[graph.pred_ptr[v]:graph.pred_ptr[v + 1]]
+            if preds:
+                lag -= max(last_times[j] for j in preds)
             if lag > 0:
                 lags[p] = lag
     return lags
 
 
-# заполнение словаря процессов по данным из файла
-# Словарь процессов имеет структуру
-# key id: value [0-id 1-duration 2-dependencies 3-begin 4-end]
-def parse_file(filename):
-    processes = dict()
-    # processes[0] = [0, 0, tuple(), 0, 0]
-    N = 0
-    with open(filename) as f:
-        for row in f:
-            row_id, row_duration, row_dependencies = row.strip().split('\t')
-            row_id = int(row_id)
-            row_duration = int(row_duration)
-            row_dependencies = tuple(map(int, row_dependencies.split(';')))
-            if row_dependencies != (0,):
-                processes[row_id] = [row_id, row_duration, row_dependencies, 0, 0]
-            else:
-                processes[row_id] = [row_id, row_duration, tuple(), 0, 0]
-            N += 1
-    return N, processes
+# Предобработка для моделей пика: окно [ES_i, LS_i] допустимого начала каждого процесса.
+# Процессы без резерва времени (ES_i == LS_i, критический путь) закрепляются,
+# переменные X[i, t] («процесс начался к моменту t») нужны только при ES_i <= t < LS_i,
+# а в обязательной части [LS_i, ES_i + d_i) процесс выполняется при любом расписании.
+# Возвращает окна и отчёт о том, сколько переменных и ограничений модели по моментам
+# времени удалось не создавать (по сравнению с окнами [0, time_limit - d_i])
+def presolve(graph: ProcessGraph, time_limit: int):
+    last_times = graph.latest_finishes(time_limit)
+    windows = dict()
+    fixed = 0
+    removed = 0
+    constraints_removed = 0
+    for v, i in enumerate(graph.ids):
+        d_i = graph.durations[v]
+        es, ls = graph.starts[v], last_times[v] - d_i
+        windows[i] = (es, ls)
+        fixed += es == ls
+        # Каждая переменная X[i, t] входит в ограничение порядка и в ограничения зависимостей
+        dropped = max(0, time_limit - d_i) - max(0, ls - es)
+        removed += dropped
+        constraints_removed += dropped * (1 + graph.pred_ptr[v + 1] - graph.pred_ptr[v])
+    stats = {
+        'fixed': fixed,
+        'variables_removed': removed,
+        'constraints_removed': constraints_removed,
+    }
+    return windows, stats
+
+
+# Переменные X[i, t] == 1, если процесс i начался не позже момента t, и ограничения,
+# связывающие их с началом процесса s[i] и зависимостями. X[i, t] не убывают по t, поэтому
+# процесс выполняется в момент t ровно тогда, когда X[i, t] - X[i, t - d_i] == 1, а зависимость
+# j -> i записывается как X[i, t] <= X[j, t - d_j]. Больших констант в модели нет, и её
+# релаксация точнее связи a[i, t] с s[i] через горизонт.
+# Вне окна значения X известны: 0 до ES_i и 1 начиная с LS_i.
+# Возвращает для каждого момента t список слагаемых суммы активных процессов и переменные X
+def add_activity_constraints(prob, s, processes, windows, time_limit):
+    from pulp import LpBinary, lpSum, LpVariable
+    steps = {i: {t: LpVariable(f"started_{i}_{t}", cat=LpBinary) for t in range(*windows[i])} for i in s}
+
+    def started(i, t):
+        if t < windows[i][0]:
+            return 0
+        if t >= windows[i][1]:
+            return 1
+        return steps[i][t]
+
+    for i in s:
+        es, ls = windows[i]
+        prob += s[i] == ls - lpSum(steps[i].values()), f"start_def_{i}"
+        for t in range(es + 1, ls):
+            prob += steps[i][t - 1] <= steps[i][t], f"started_order_{i}_{t}"
+        for j in processes[i][2]:
+            for t in range(es, ls):
+                prob += steps[i][t] <= started(j, t - processes[j][1]), f"dep_{j}_to_{i}_{t}"
+
+    active = {t: [] for t in range(time_limit)}
+    for i in s:
+        es, ls = windows[i]
+        d_i = processes[i][1]
+        if d_i == 0:
+            continue
+        for t in range(max(es, 0), min(ls + d_i, time_limit)):
+            # В обязательной части [LS_i, ES_i + d_i) слагаемое равно 1 при любом допустимом начале
+            active[t].append(started(i, t) - started(i, t - d_i))
+    return active, steps
+
 
-def parse_file_6(filename):
+# Начальные значения X[i, t] по расписанию starts
+def set_initial_steps(steps, starts):
+    for i, row in steps.items():
+        for t, variable in row.items():
+            variable.setInitialValue(int(starts[i] <= t))
+
+
+CACHE_SUFFIX = '.s22'
+DEPENDENCY_SEPARATORS = re.compile(r'[;,\s]+')
+
+
+# Загрузка варианта задачи: текстовый файл (TSV/CSV, строки скопированы из Excel) или
+# лист Excel (.xlsx). Файл читается построчно; пустые строки, строка заголовка и лишние
+# столбцы пропускаются, пробелы вокруг зависимостей допускаются. Процесс, у которого вместо
+# длительности стоит буква (t), считается процессом с неизвестной длительностью.
+# Повторные id, нечисловые значения, ссылки на несуществующие процессы и циклы
+# сообщаются ValueError с именем файла и номером строки.
+# cache=True сохраняет скомпилированный граф рядом с файлом (.s22) и при следующей
+# загрузке читает его без разбора, если исходный файл с тех пор не менялся;
+# повреждённый файл кэша разбирается заново и перезаписывается, а если каталог недоступен
+# для записи, граф просто не сохраняется
+def load_instance(filename, cache=False):
+    if filename.endswith(CACHE_SUFFIX):
+        return ProcessGraph.load(filename)
+    cache_file = filename + CACHE_SUFFIX
+    if cache and os.path.exists(cache_file) and os.path.getmtime(cache_file) >= os.path.getmtime(filename):
+        try:
+            return ProcessGraph.load(cache_file)
+        except ValueError:
+            pass
     processes = dict()
-    with open(filename) as f:
+    lines = dict()
+    placeholder = None
+    for line, row in read_rows(filename):
+        if not row or not row[0]:
+            continue
+        try:
+            row_id = int(row[0])
+        except ValueError:
+            if not processes and placeholder is None:
+                continue  # строка заголовка
+            raise ValueError(f'{filename}:{line}: id процесса не целое число: {row[0]!r}')
+        if row_id in lines:
+            raise ValueError(f'{filename}:{line}: повторный id {row_id} (впервые в строке {lines[row_id]})')
+        lines[row_id] = line
+        if len(row) < 2 or not row[1]:
+            raise ValueError(f'{filename}:{line}: не указана длительность процесса {row_id}')
+        try:
+            row_dependencies = tuple(int(dep) for dep in DEPENDENCY_SEPARATORS.split(row[2] if len(row) > 2 else '')
+                                     if dep and dep != '0')
+        except ValueError:
+            raise ValueError(f'{filename}:{line}: зависимости процесса {row_id} не числа: {row[2]!r}')
+        if row[1].isalpha():
+            if placeholder is not None:
+                raise ValueError(f'{filename}:{line}: второй процесс с неизвестной длительностью '
+                                 f'(первый — {placeholder})')
+            placeholder = row_id
+            row_duration = 0
+        else:
+            try:
+                row_duration = int(row[1])
+            except ValueError:
+                raise ValueError(f'{filename}:{line}: длительность процесса {row_id} не целое число: {row[1]!r}')
+            if row_duration < 0:
+                raise ValueError(f'{filename}:{line}: отрицательная длительность процесса {row_id}')
+        processes[row_id] = [row_id, row_duration, row_dependencies, 0, 0]
+    for p, process in processes.items():
+        for dep in process[2]:
+            if dep not in processes:
+                raise ValueError(f'{filename}:{lines[p]}: процесс {p} зависит от несуществующего процесса {dep}')
+    try:
+        graph = ProcessGraph(processes, placeholder)
+    except ValueError as error:
+        cycle = dependency_cycle(processes)
+        if cycle:
+            raise ValueError(f'{filename}:{lines[cycle[0]]}: зависимости процессов содержат цикл '
+                             f'{" -> ".join(map(str, cycle + [cycle[0]]))}')
+        raise ValueError(f'{filename}: {error}')
+    if cache:
+        try:
+            graph.save(cache_file)
+        except OSError:
+            pass
+    return graph
+
+
+# Цикл в зависимостях: процессы p1, p2, ..., где каждый зависит от следующего, а последний —
+# от p1 (None, если циклов нет). Поиск в глубину без рекурсии, чтобы длинные цепочки
+# не упирались в предел глубины стека
+def dependency_cycle(processes):
+    state = dict()  # 1 — процесс на текущем пути, 2 — обработан
+    for root in processes:
+        if root in state:
+            continue
+        path = [root]
+        state[root] = 1
+        stack = [iter(processes[root][2])]
+        while stack:
+            dep = next(stack[-1], None)
+            if dep is None:
+                state[path.pop()] = 2
+                stack.pop()
+            elif state.get(dep) == 1:
+                return path[path.index(dep):]
+            elif dep not in state:
+                state[dep] = 1
+                path.append(dep)
+                stack.append(iter(processes[dep][2]))
+    return None
+
+
+# Строки файла как списки значений ячеек (строки без пробелов по краям) с номерами строк.
+# Разделитель текстового файла — табуляция, если она есть в первой непустой строке,
+# иначе запятая или точка с запятой
+def read_rows(filename):
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        yield from read_excel_rows(filename)
+        return
+    with open(filename, encoding='utf-8-sig', errors='replace', newline='') as f:
+        first = ''
+        for first in f:
+            if first.strip():
+                break
+        delimiter = '\t' if '\t' in first else ',' if ',' in first else ';'
+        f.seek(0)
+        for line, row in enumerate(csv.reader(f, delimiter=delimiter), 1):
+            yield line, [cell.strip() for cell in row]
+
+
+# Строки первого листа Excel; openpyxl нужен только для этого формата
+def read_excel_rows(filename):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportError('Для чтения файлов Excel установите openpyxl: pip install openpyxl')
+    workbook = load_workbook(filename, read_only=True, data_only=True)
+    try:
+        for line, row in enumerate(workbook.worksheets[0].iter_rows(values_only=True), 1):
+            cells = []
+            for cell in row:
+                if isinstance(cell, float) and cell.is_integer():
+                    cell = int(cell)
+                cells.append('' if cell is None else str(cell).strip())
+            yield line, cells
+    finally:
+        workbook.close()
+
+
+# Отпечаток графа: одинаков для файлов, различающихся только форматом записи
+# (порядок строк и зависимостей, разделители, повторы зависимостей)
+def fingerprint(processes, placeholder=None):
+    digest = hashlib.sha256()
+    for p in sorted(processes):
+        deps = ','.join(map(str, sorted(set(processes[p][2]))))
+        digest.update(f'{p}:{processes[p][1]}:{deps};'.encode())
+    digest.update(f't:{placeholder}'.encode())
+    return digest.hexdigest()
+
+
+# Кэш результатов на диске между запусками. Ключ — список из отпечатка графа, вида результата
+# и параметров, значение — словарь, записанный в JSON в файл с именем по хэшу ключа.
+# Каждое обращение обновляет время изменения файла, и при превышении max_bytes удаляются
+# записи, которые дольше всего не использовались (LRU). Запись атомарна, поэтому кэшем
+# могут одновременно пользоваться несколько процессов
+class ResultCache:
+    def __init__(self, directory=None, max_bytes=256 * 2 ** 20):
+        self.directory = directory or os.path.join(
+            os.environ.get('XDG_CACHE_HOME') or os.path.expanduser(os.path.join('~', '.cache')), 'solver22')
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+        return os.path.join(self.directory, digest + '.json')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return value
+
+    def put(self, key, value):
+        import tempfile
+        handle, temporary = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        with os.fdopen(handle, 'w', encoding='utf-8') as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(temporary, self._path(key))
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+# Решатель CBC: threads — число потоков, time_budget — ограничение времени решения в секундах,
+# warm_start — начать поиск с текущих значений переменных, log_path — файл для журнала CBC
+def cbc_solver(threads=None, time_budget=None, warm_start=False, log_path=None):
+    from pulp import PULP_CBC_CMD
+    return PULP_CBC_CMD(msg=0, threads=threads, timeLimit=time_budget, warmStart=warm_start, logPath=log_path)
+
+
+# Режим профилирования: время и пик памяти Python каждого этапа (загрузка, presolve, построение
+# модели, запись модели для CBC, решение), размер каждой модели и итог CBC (статус, разрыв,
+# число узлов). Этапы вкладываются друг в друга: solve включает write, horizon — все этапы одного горизонта.
+# record() — словарь для записи в JSON
+class Profile:
+    def __init__(self):
+        self.phases = []
+        self.models = []
+        self._peaks = []
+        self._tracing = not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    # Пик памяти внешних этапов сохраняется в _peaks перед сбросом пика tracemalloc
+    def _fold_peak(self):
+        peak = tracemalloc.get_traced_memory()[1]
+        self._peaks = [max(outer, peak) for outer in self._peaks]
+        return peak
+
+    @contextmanager
+    def phase(self, name, **fields):
+        self._fold_peak()
+        tracemalloc.reset_peak()
+        self._peaks.append(0)
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - begin
+            peak = max(self._peaks.pop(), self._fold_peak())
+            self.phases.append({'phase': name, **fields, 'seconds': round(seconds, 6), 'peak_memory': peak})
+
+    # Замеры, сделанные в другом процессе (find_horizon с workers > 1)
+    def merge(self, record):
+        self.phases.extend(record['phases'])
+        self.models.extend(record['models'])
+
+    def record(self):
+        return {'phases': self.phases, 'models': self.models}
+
+
+# Этап profile.phase или пустой контекст, если профилирование выключено
+def phase(profile, name, **fields):
+    return profile.phase(name, **fields) if profile is not None else nullcontext()
+
+
+# Размер модели: переменные (в том числе двоичные и целые), ограничения и ненулевые коэффициенты
+def model_stats(prob):
+    from pulp import LpInteger
+    variables = prob.variables()
+    binaries = sum(1 for v in variables if v.isBinary())
+    return {
+        'model': prob.name,
+        'variables': len(variables),
+        'binaries': binaries,
+        'integers': sum(1 for v in variables if v.cat == LpInteger) - binaries,
+        'constraints': len(prob.constraints),
+        'nonzeros': sum(len(constraint) for constraint in prob.constraints.values()),
+    }
+
+
+# Итог из журнала CBC: строки «Имя: значение» после «Result - ...» (Objective value, Gap,
+# Enumerated nodes, Total iterations, Time (Wallclock seconds))
+def read_cbc_log(filename):
+    fields = {
+        'Objective value': 'objective',
+        'Lower bound': 'bound',
+        'Gap': 'gap',
+        'Enumerated nodes': 'nodes',
+        'Total iterations': 'iterations',
+        'Time (Wallclock seconds)': 'cbc_seconds',
+    }
+    result = dict()
+    with open(filename, errors='replace') as f:
         for row in f:
-            if 't' not in row:
-                row_id, row_duration, row_dependencies = row.strip().split('\t')
-                row_id = int(row_id)
-                row_duration = int(row_duration)
-                row_dependencies = tuple(map(int, row_dependencies.split(';')))
-                if row_dependencies != (0,):
-                    processes[row_id] = [row_id, row_duration, row_dependencies, 0, 0]
-                else:
-                    processes[row_id] = [row_id, row_duration, tuple(), 0, 0]
-            else:
-                row_id, row_duration, row_dependencies = row.strip().split('\t')
-                row_id = int(row_id)
-                # row_duration = int(row_duration)
-                row_dependencies = tuple(map(int, row_dependencies.split(';')))
-                if row_dependencies != (0,):
-                    t_row = [row_id, 0, row_dependencies, 0, 0]
-                else:
-                    t_row = [row_id, 0, tuple(), 0, 0]
-    return processes, t_row
+            if row.startswith('Result - '):
+                result['cbc_result'] = row[len('Result - '):].strip()
+            name, _, number = row.partition(':')
+            if name.strip() in fields and 'cbc_result' in result:
+                try:
+                    number = float(number)
+                except ValueError:
+                    continue
+                result[fields[name.strip()]] = int(number) if fields[name.strip()] in ('nodes', 'iterations') \
+                    else number
+    if 'gap' not in result and result.get('cbc_result', '').startswith('Optimal'):
+        result['gap'] = 0.0
+    return result
 
 
-# Нахождение максимально возможного числа процессов, которые могут выполняться одновременно
-def maximize_peak_parallelism(processes: dict, time_limit: int) -> int:
-    prob = LpProblem("MaximizePeakParallelism", LpMaximize)
+# Решение модели с warm start; при профилировании замеряются запись модели и работа CBC,
+# а в profile.models добавляются размер модели и итог CBC
+def solve_model(prob, threads=None, time_budget=None, profile=None):
+    from pulp import LpStatus
+    import tempfile
+    if profile is None:
+        prob.solve(cbc_solver(threads, time_budget, warm_start=True))
+        return
+    stats = model_stats(prob)
+    handle, log_path = tempfile.mkstemp(suffix='.log')
+    os.close(handle)
+    write = prob.writeMPS
+
+    def timed_write(*args, **kwargs):
+        with profile.phase('write', model=prob.name):
+            return write(*args, **kwargs)
+
+    prob.writeMPS = timed_write
+    try:
+        with profile.phase('solve', model=prob.name):
+            prob.solve(cbc_solver(threads, time_budget, warm_start=True, log_path=log_path))
+        stats['status'] = LpStatus[prob.status]
+        stats.update(read_cbc_log(log_path))
+    finally:
+        del prob.writeMPS
+        os.remove(log_path)
+    profile.models.append(stats)
+
+
+# Начальное расписание для warm start: initial, а если оно не задано, каждый процесс
+# начинается как можно раньше. Возвращает это расписание
+def set_initial_starts(s, windows, initial=None):
+    starts = initial or {i: windows[i][0] for i in s}
+    for i in s:
+        s[i].setInitialValue(starts[i])
+    return starts
+
+
+# Ступенчатая функция числа одновременно выполняющихся процессов в расписании starts
+# (заметающая прямая по отсортированным началам и окончаниям, O(n log n)).
+# Возвращает массивы moments и counts: с момента moments[k] до moments[k + 1] выполняется
+# counts[k] процессов, после последнего момента — ни одного. Процесс, закончившийся в момент t,
+# в момент t уже не выполняется, а процессы нулевой длительности не учитываются
+def concurrency_profile(processes, starts):
+    changes = dict()
+    for i, start in starts.items():
+        if processes[i][1] > 0:
+            changes[start] = changes.get(start, 0) + 1
+            changes[start + processes[i][1]] = changes.get(start + processes[i][1], 0) - 1
+    moments = array('q')
+    counts = array('q')
+    running = 0
+    for moment in sorted(changes):
+        running += changes[moment]
+        if not counts or counts[-1] != running:
+            moments.append(moment)
+            counts.append(running)
+    return moments, counts
+
+
+# Число процессов, выполняющихся в момент t
+def running_at(moments, counts, t):
+    k = bisect_right(moments, t) - 1
+    return counts[k] if k >= 0 else 0
+
+
+# Самый длинный отрезок, на котором выполняется не менее level процессов:
+# (начало, длительность), или (None, 0), если такого отрезка нет
+def longest_at_level(moments, counts, level):
+    best = (None, 0)
+    begin = None
+    for k, count in enumerate(counts):
+        if count >= level and begin is None:
+            begin = moments[k]
+        elif count < level and begin is not None:
+            if moments[k] - begin > best[1]:
+                best = (begin, moments[k] - begin)
+            begin = None
+    return best
+
+
+# Начальные значения событийной модели: пик в момент moment и покрывающие его процессы
+def set_initial_cover(processes, starts, peak_start, y, moment):
+    if moment is None:
+        return
+    peak_start.setInitialValue(moment)
+    for i in y:
+        y[i].setInitialValue(int(starts[i] <= moment < starts[i] + processes[i][1]))
+
+
+# Наибольшее число одновременно выполняющихся процессов в расписании starts
+def schedule_peak(processes, starts):
+    return max(concurrency_profile(processes, starts)[1], default=0)
+
 
+# Общая часть модели по моментам времени: начала процессов в окнах из presolve
+# и переменные X[i, t], через которые заданы зависимости и активность процессов
+def build_time_model(name, processes, time_limit, windows):
+    from pulp import LpInteger, LpMaximize, LpProblem, LpVariable
+    prob = LpProblem(name, LpMaximize)
     procs = sorted(processes.keys())
-    durations = {i: processes[i][1] for i in procs}
-    dependencies = {i: processes[i][2] for i in procs}
 
     # Переменные начала процесса
-    s = {i: LpVariable(f"s_{i}", 0, time_limit - durations[i], cat=LpInteger) for i in procs}
+    s = {i: LpVariable(f"s_{i}", windows[i][0], windows[i][1], cat=LpInteger) for i in procs}
 
-    # Переменные активности процесса в момент времени t
-    a = {
-        (i, t): LpVariable(f"a_{i}_{t}", cat=LpBinary)
-        for i in procs for t in range(time_limit)
-    }
+    # Связываем X[i, t] с временем начала s[i], зависимостями и длительностью
+    active, steps = add_activity_constraints(prob, s, processes, windows, time_limit)
+    return prob, s, active, steps
+
+
+# Цель «максимальное число одновременно выполняющихся процессов» для модели по моментам времени.
+# min_peak — уже достигнутый пик: моменты, в которые могут выполняться меньше min_peak
+# процессов, пиком не станут, и переменные для них не создаются.
+# Возвращает переменную пика
+def add_time_peak_parallelism(prob, active, time_limit, n, min_peak=0):
+    from pulp import LpBinary, LpInteger, lpSum, LpVariable
+    times = [t for t in range(time_limit) if len(active[t]) >= min_peak]
 
     # Булевы переменные: достигается ли пик в момент t
     is_peak_time = {
         t: LpVariable(f"is_peak_time_{t}", cat=LpBinary)
-        for t in range(time_limit)
+        for t in times
     }
 
     # Переменная пика
-    peak = LpVariable("peak", 0, time_limit, cat=LpInteger)
-
-    # Ограничения по зависимостям: s[i] >= s[j] + duration[j]
-    for i in procs:
-        for j in dependencies[i]:
-            prob += s[i] >= s[j] + durations[j], f"dep_{j}_to_{i}"
-
-    # Связываем a[i, t] с временем начала s[i] и длительностью
-    for i in procs:
-        d_i = durations[i]
-        for t in range(time_limit):
-            # a[i, t] == 1 если s[i] <= t < s[i] + d_i
-            # Заменим строгое неравенство на эквивалентное >=
-            prob += s[i] <= t + (1 - a[i, t]) * time_limit, f"active_start_{i}_{t}"
-            prob += s[i] + d_i >= t + 1 - (1 - a[i, t]) * time_limit, f"active_end_{i}_{t}"
+    peak = LpVariable("peak", 0, n, cat=LpInteger)
 
     # Ограничения на пик: в момент t сумма активных процессов >= peak * is_peak_time[t]
-    big_M = len(procs)
-    for t in range(time_limit):
-        prob += lpSum(a[i, t] for i in procs) >= peak - (1 - is_peak_time[t]) * big_M, f"peak_def_{t}"
-    prob += lpSum(is_peak_time[t] for t in range(time_limit)) == 1, "one_peak_time"
+    big_M = n
+    for t in times:
+        prob += lpSum(active[t]) >= peak - (1 - is_peak_time[t]) * big_M, f"peak_def_{t}"
+    prob += lpSum(is_peak_time.values()) == 1, "one_peak_time"
 
     # Требуем, чтобы пик был достигнут хотя бы один раз
-    prob += lpSum(is_peak_time[t] for t in range(time_limit)) >= 1, "at_least_one_peak"
+    prob += lpSum(is_peak_time.values()) >= 1, "at_least_one_peak"
 
     # Целевая функция — максимизировать peak
-    prob += peak, "maximize_peak"
+    prob.setObjective(peak)
+    return peak
 
-    # Решение
-    prob.solve(PULP_CBC_CMD(msg=0))
 
-    # Вернём значение peak
-    return int(value(peak))
+# Цель «максимальная длительность интервала, в котором выполняется не менее peak процессов»
+# для модели по моментам времени. Моменты, в которые не могут выполняться peak процессов,
+# в интервал не входят: переменные is_in_peak для них не создаются, а так как их сумма равна
+# длине интервала, интервал такие моменты не содержит.
+# Интервал задан без больших констант: момент t входит в него, только если в него входит t - 1
+# или интервал начинается в t (begins[t]), а начало у интервала одно.
+# incumbent — (начало, длительность) пика в известном расписании (см. incumbent_run):
+# интервал становится начальным решением, но не нижней границей цели.
+# Возвращает переменную длительности пика
+def add_time_peak_duration(prob, active, time_limit, peak, incumbent=(None, 0)):
+    from pulp import LpBinary, LpInteger, lpSum, LpVariable
+    times = [t for t in range(time_limit) if len(active[t]) >= peak]
 
+    peak_duration = LpVariable("peak_duration", lowBound=0, upBound=len(times), cat=LpInteger)
 
-def maximize_peak_duration(processes, time_limit, peak):
-    prob = LpProblem("MaximizePeakDuration", LpMaximize)
+    # Переменные is_in_peak[t] и начала интервала (при целых is_in_peak begins[t] в начале
+    # интервала равно 1, поэтому целочисленность для них не нужна)
+    is_in_peak = {
+        t: LpVariable(f"is_in_peak_{t}", cat=LpBinary)
+        for t in times
+    }
+    begins = {t: LpVariable(f"peak_begins_{t}", lowBound=0, upBound=1) for t in times}
+    prob += lpSum(begins.values()) <= 1, "one_peak_start"
 
-    procs = list(processes.keys())
+    # Ограничения на процессы, выполняющиеся в пиковом интервале
+    for t in times:
+        prob += is_in_peak[t] <= is_in_peak.get(t - 1, 0) + begins[t], f"peak_continues_{t}"
 
-    # Время начала каждого процесса
-    s = {
-        i: LpVariable(f"s_{i}", lowBound=0, upBound=time_limit - processes[i][1], cat=LpInteger)
-        for i in procs
-    }
+        # В пиковом интервале должно выполняться не менее peak процессов
+        # (в обязательной части слагаемые равны единице, поэтому равенство здесь неприменимо)
+        prob += lpSum(active[t]) >= peak * is_in_peak[t], f"peak_constraint_{t}"
 
-    # Бинарные переменные активности процесса i в момент t
-    a = {
-        (i, t): LpVariable(f"a_{i}_{t}", cat=LpBinary)
-        for i in procs for t in range(time_limit)
-    }
+    # Убедимся, что переменные is_in_peak точно соответствуют заданному пику
+    prob += lpSum(is_in_peak.values()) == peak_duration, "correct_peak_count"
 
-    # Переменные начала и конца пикового интервала
-    peak_start = LpVariable("peak_start", lowBound=0, upBound=time_limit - 1, cat=LpInteger)
-    peak_end = LpVariable("peak_end", lowBound=1, upBound=time_limit, cat=LpInteger)
-    peak_duration = LpVariable("peak_duration", lowBound=0, upBound=time_limit, cat=LpInteger)
+    start, duration = incumbent
+    if duration > 0:
+        peak_duration.setInitialValue(duration)
+        for t in times:
+            is_in_peak[t].setInitialValue(int(start <= t < start + duration))
+            begins[t].setInitialValue(int(t == start))
 
-    # Целевая функция — максимизировать длительность пика
-    prob += peak_duration, "Maximize_peak_duration"
+    # Целевая функция — максимизировать длительность пика (сумма is_in_peak, а не одна переменная
+    # peak_duration: см. комментарий к цели в add_events_peak_duration)
+    prob.setObjective(lpSum(is_in_peak.values()))
+    return peak_duration
 
-    # Связь начала и конца пика
-    prob += peak_end == peak_start + peak_duration, "peak_duration_def"
 
-    # Ограничения на активность процессов
-    for i in procs:
-        d_i = processes[i][1]
-        for t in range(time_limit):
-            prob += s[i] <= t + (1 - a[i, t]) * time_limit, f"active_start_{i}_{t}"
-            prob += s[i] + d_i >= t + 1 - (1 - a[i, t]) * time_limit, f"active_end_{i}_{t}"
+# Начальное решение для моделей пика по известному допустимому расписанию starts:
+# момент наибольшего числа выполняющихся процессов и это число, а для заданного peak —
+# самый длинный отрезок, на котором выполняется не менее peak процессов. Оптимум модели
+# не хуже этих значений
+def incumbent_peak(processes, starts):
+    moments, counts = concurrency_profile(processes, starts)
+    if not counts:
+        return None, 0
+    k = max(range(len(counts)), key=counts.__getitem__)
+    return moments[k], counts[k]
 
-    # Переменные is_in_peak[t] и уточнённые условия включения t в интервал пика
-    is_in_peak = {
-        t: LpVariable(f"is_in_peak_{t}", cat=LpBinary)
-        for t in range(time_limit)
-    }
-    M = time_limit  # Большое число
 
-    # Ограничения на процессы, выполняющиеся в пиковом интервале
-    for t in range(time_limit):
-        # t ∈ [peak_start, peak_end) ⇔ is_in_peak[t] = 1
-        prob += peak_start <= t + (1 - is_in_peak[t]) * M, f"peak_start_condition_{t}"
-        prob += t <= peak_end - 1 + (1 - is_in_peak[t]) * M, f"peak_end_condition_{t}"
+def incumbent_run(processes, starts, peak):
+    return longest_at_level(*concurrency_profile(processes, starts), peak)
 
-        # В пиковом интервале должно выполняться ровно peak процессов
-        prob += lpSum(a[i, t] for i in procs) == peak * is_in_peak[t], f"peak_constraint_{t}"
 
-    # Убедимся, что переменные is_in_peak точно соответствуют заданному пику
-    prob += lpSum(is_in_peak[t] for t in range(time_limit)) == peak_duration, "correct_peak_count"
+# Нахождение максимально возможного числа процессов, которые могут выполняться одновременно
+# formulation='events' — событийная модель, не зависящая от величины длительностей
+# windows — окна допустимого начала процессов из presolve (если не заданы, вычисляются),
+# graph — ProcessGraph тех же процессов, если он уже построен
+def maximize_peak_parallelism(processes: dict, time_limit: int, formulation='time', windows=None,
+                              threads=None, time_budget=None, initial=None, profile=None, graph=None) -> int:
+    from pulp import lpSum, value
+    if graph is None:
+        graph = ProcessGraph(processes)
+    if windows is None:
+        with phase(profile, 'presolve'):
+            windows, _ = presolve(graph, time_limit)
+    with phase(profile, 'model', formulation=formulation, horizon=time_limit):
+        if formulation == 'events':
+            prob, s, peak_start, y = build_events_model("MaximizePeakParallelismEvents", processes, time_limit,
+                                                        windows, graph.ancestors())
+            prob.setObjective(lpSum(y.values()))
+            starts = set_initial_starts(s, windows, initial)
+            set_initial_cover(processes, starts, peak_start, y, incumbent_peak(processes, starts)[0])
+        else:
+            prob, s, active, steps = build_time_model("MaximizePeakParallelism", processes, time_limit, windows)
+            starts = set_initial_starts(s, windows, initial)
+            set_initial_steps(steps, starts)
+            add_time_peak_parallelism(prob, active, time_limit, len(processes), schedule_peak(processes, starts))
+    solve_model(prob, threads, time_budget, profile)
+    return int(round(value(prob.objective)))
 
-    # Ограничения на зависимости между процессами
-    for i in procs:
-        for dep in processes[i][2]:
-            prob += s[i] >= s[dep] + processes[dep][1], f"dependency_{dep}_to_{i}"
 
-    # Решение
-    prob.solve(PULP_CBC_CMD(msg=0))
+def maximize_peak_duration(processes, time_limit, peak, formulation='time', windows=None,
+                           threads=None, time_budget=None, initial=None, profile=None, graph=None):
+    if graph is None and (windows is None or formulation == 'events'):
+        graph = ProcessGraph(processes)
+    if windows is None:
+        with phase(profile, 'presolve'):
+            windows, _ = presolve(graph, time_limit)
+    with phase(profile, 'model', formulation=formulation, horizon=time_limit):
+        if formulation == 'events':
+            ancestors = graph.ancestors()
+            prob, s, peak_start, y = build_events_model("MaximizePeakDurationEvents", processes, time_limit,
+                                                        windows, ancestors)
+            starts = set_initial_starts(s, windows, initial)
+            run = incumbent_run(processes, starts, peak)
+            set_initial_cover(processes, starts, peak_start, y,
+                              run[0] if run[1] > 0 else incumbent_peak(processes, starts)[0])
+            peak_duration = add_events_peak_duration(prob, s, peak_start, y, processes, time_limit, peak,
+                                                     windows, ancestors, run, starts)
+        else:
+            prob, s, active, steps = build_time_model("MaximizePeakDuration", processes, time_limit, windows)
+            starts = set_initial_starts(s, windows, initial)
+            set_initial_steps(steps, starts)
+            peak_duration = add_time_peak_duration(prob, active, time_limit, peak,
+                                                   incumbent_run(processes, starts, peak))
+    solve_model(prob, threads, time_budget, profile)
+    return peak_duration_result(prob, s, peak_duration)
 
-    if LpStatus[prob.status] != "Optimal":
-        print("Не удалось найти оптимальное решение.")
-        return None, None
 
-    start_times = {i: int(value(s[i])) for i in procs}
-    max_peak_duration = int(value(peak_duration))
+# Расписание, длительность пика и признак оптимальности из решённой модели.
+# При остановке CBC по ограничению времени status остаётся Optimal, поэтому оптимальность
+# проверяется по sol_status: найденное, но не доказанное решение возвращается с признаком False
+def peak_duration_result(prob, s, peak_duration):
+    from pulp import LpSolutionIntegerFeasible, LpSolutionOptimal, value
+    if prob.sol_status not in (LpSolutionOptimal, LpSolutionIntegerFeasible):
+        print("Не удалось найти оптимальное решение.", file=sys.stderr)
+        return None, None, False
 
-    return start_times, max_peak_duration
+    start_times = {i: int(round(value(s[i]))) for i in s}
+    max_peak_duration = int(round(value(peak_duration)))
 
+    return start_times, max_peak_duration, prob.sol_status == LpSolutionOptimal
 
-# Нахождение максимального количества процессов, которые завершатся за определенное время
-def maximum_on_time(processes, time_limit):
-    G = nx.DiGraph()
-    procs = sorted(processes.keys())
-    G.add_nodes_from(procs)
-    for i in procs:
-        dependencies = processes[i][2]
-        if dependencies:
-            G.add_edges_from([(dep, i) for dep in dependencies])
-    sorted_processes = nx.topological_sort(G)
-    for process in processes:
-        processes[process][3] = 0
-        processes[process][4] = 0
-    # Расчёт времени выполнения для каждого процесса
-    for process in sorted_processes:
-        duration = processes[process][1]
-        max_preceding_time = max((processes[pred][4] for pred in
-                                  processes[process][2]), default=0)
-        processes[process][3] = max_preceding_time
-        processes[process][4] = duration + max_preceding_time
-    # Подсчет количества процессов, которые завершатся за указанное время
-    amount = 0
-    for proc in processes:
-        if processes[proc][4] <= time_limit:
-            amount += 1
-    return amount
 
-def minimal_with_lag_for_dependent(processes: dict, lag:int):
-    G = nx.DiGraph()
+# Общая часть событийной модели: вместо переменных a[i, t] на каждый момент времени
+# выбирается один момент peak_start и для каждого процесса признак y[i] «выполняется в peak_start».
+# Размер модели зависит только от числа процессов и зависимостей, а не от длительностей.
+# Максимальный пик — это максимум суммы y[i].
+# Большие константы берутся из окон процессов, а не из горизонта, поэтому релаксация
+# не ослабевает с ростом горизонта.
+# ancestors — множества предков процессов (ProcessGraph.ancestors())
+def build_events_model(name, processes, time_limit, windows, ancestors):
+    from pulp import LpBinary, LpInteger, LpMaximize, LpProblem, LpVariable
+    prob = LpProblem(name, LpMaximize)
+
     procs = sorted(processes.keys())
-    G.add_nodes_from(procs)
+    durations = {i: processes[i][1] for i in procs}
+    busy = [i for i in procs if durations[i] > 0]
+
+    s = {i: LpVariable(f"s_{i}", windows[i][0], windows[i][1], cat=LpInteger) for i in procs}
+
+    # Момент, в который достигается пик: в нём выполняется хотя бы один процесс
+    first = min((windows[i][0] for i in busy), default=0)
+    last = max((windows[i][1] + durations[i] for i in busy), default=time_limit) - 1
+    peak_start = LpVariable("peak_start", first, last, cat=LpInteger)
+
+    # y[i] == 1 только если s[i] <= peak_start < s[i] + d_i
+    # (процесс нулевой длительности не выполняется ни в какой момент, и y для него не нужен)
+    y = {i: LpVariable(f"y_{i}", cat=LpBinary) for i in busy}
+
     for i in procs:
-        dependencies = processes[i][2]
-        if dependencies:
-            G.add_edges_from([(dep, i) for dep in dependencies])
-    sorted_processes = nx.topological_sort(G)
-    for process in processes:
-        processes[process][3] = 0
-        processes[process][4] = 0
-    # Расчёт времени выполнения для каждого процесса
-    for process in sorted_processes:
-        duration = processes[process][1]
-        max_preceding_time = max((processes[pred][4] for pred in
-                                  processes[process][2]), default=0)
-        processes[process][3] = max_preceding_time + lag * (max_preceding_time != 0)
-        processes[process][4] = duration + processes[process][3]
-    return max(processes[pr][4] for pr in processes)
-
-def maximal_t_for_N_processes_on_T(processes: dict, N, T, t_row):
-    t_id = t_row[0]
-    processes[t_id] = t_row
-    t = 1
-    processes[t_id][1] = t
-    current_N = maximum_on_time(processes, T)
-    while current_N >= N:
-        t += 1
-        processes[t_id][1] = t
-        current_N = maximum_on_time(processes, T)
-    return t - 1
-
-def minimal_t_for_all_on_T(processes, T, t_row):
-    t_id = t_row[0]
-    processes[t_id] = t_row
-    t = 1
-    processes[t_id][1] = t
-    _, time_limit = find_all_critical_paths(processes)
-    while time_limit <= T:
-        t += 1
-        processes[t_id][1] = t
-        _, time_limit = find_all_critical_paths(processes)
-    return t - 1
-
-def amount_with_oddity(processes: dict, oddity):
-    G = nx.DiGraph()
+        for j in processes[i][2]:
+            prob += s[i] >= s[j] + durations[j], f"dep_{j}_to_{i}"
+
+    # Процесс и его предок не выполняются одновременно: решений эти ограничения не отсекают,
+    # но сужают релаксацию
+    for i in busy:
+        for j in ancestors[i]:
+            if j in y:
+                prob += y[i] + y[j] <= 1, f"chain_{j}_{i}"
+    for i in busy:
+        prob += s[i] <= peak_start + (1 - y[i]) * max(windows[i][1] - first, 0), f"cover_start_{i}"
+        prob += (s[i] + durations[i] >= peak_start + 1
+                 - (1 - y[i]) * max(last + 1 - windows[i][0] - durations[i], 0)), f"cover_end_{i}"
+
+    return prob, s, peak_start, y
+
+
+# Событийная модель длительности пика (incumbent — как в add_time_peak_duration,
+# ancestors — как в build_events_model).
+# Пиковый интервал [peak_start, peak_end) покрыт не менее чем peak процессами, если
+# это верно в момент peak_start и в момент окончания каждого процесса, попавшего внутрь
+# интервала (только в эти моменты число выполняющихся процессов может уменьшиться).
+# c[i, k] == 1 только если процесс i выполняется в момент окончания процесса k,
+# поэтому переменных O(n^2) вместо O(n * time_limit). Большие константы, как и в
+# build_events_model, вычисляются по окнам процессов.
+# starts — расписание, по которому заданы начальные значения s, y и peak_start: из него
+# получают значения и остальные переменные, чтобы CBC принял начальное решение целиком.
+# Возвращает переменную длительности пика
+def add_events_peak_duration(prob, s, peak_start, y, processes, time_limit, peak, windows, ancestors,
+                             incumbent=(None, 0), starts=None):
+    from pulp import LpBinary, LpInteger, lpSum, LpVariable
     procs = sorted(processes.keys())
-    G.add_nodes_from(procs)
-    for i in procs:
-        dependencies = processes[i][2]
-        if dependencies:
-            G.add_edges_from([(dep, i) for dep in dependencies])
-    sorted_processes = nx.topological_sort(G)
-    for process in processes:
-        processes[process][3] = 0
-        processes[process][4] = 0
-    paths = {process: [] for process in processes}
-    # Расчёт времени выполнения для каждого процесса
-    for process in sorted_processes:
-        duration = processes[process][1]
-        max_preceding_time = max((processes[pred][4] for pred in
-                                  processes[process][2]), default=0)
-        processes[process][3] = max_preceding_time
-        processes[process][4] = duration + max_preceding_time
-        # Обновление путей
-        for pred in processes[process][2]:
-            if processes[pred][4] + duration == processes[process][4]:
-                paths[process].append(pred)
-    amount = len([proc for proc in processes if processes[proc][4] % 2 == oddity])
+    durations = {i: processes[i][1] for i in procs}
+    busy = [i for i in procs if durations[i] > 0]
+    first, last = int(peak_start.lowBound), int(peak_start.upBound)
+
+    # В каждый момент пика выполняется не менее peak процессов, поэтому длительность
+    # пика не больше суммарной длительности процессов, делённой на peak
+    longest = min(time_limit, last + 1 - first)
+    if peak > 0:
+        longest = min(longest, sum(durations.values()) // peak)
+    peak_end = LpVariable("peak_end", lowBound=first, upBound=last + 1, cat=LpInteger)
+    peak_duration = LpVariable("peak_duration", lowBound=0, upBound=max(longest, 0), cat=LpInteger)
+    # has_peak == 0 допускает пустой пиковый интервал, как и в модели по моментам времени
+    has_peak = LpVariable("has_peak", cat=LpBinary)
+
+    # Цель записана через начало и конец интервала, а не одной целочисленной переменной:
+    # с такой целью и начальным решением CBC 2.10 может остановиться на неоптимальном ответе
+    prob.setObjective(peak_end - peak_start)
+    prob += peak_end == peak_start + peak_duration, "peak_duration_def"
+    prob += peak_duration <= max(longest, 0) * has_peak, "empty_peak"
+
+    # Покрытие момента peak_start
+    prob += lpSum(y.values()) >= peak * has_peak, "peak_at_start"
+
+    # Окончание процесса нулевой длительности не уменьшает число выполняющихся процессов
+    inside, before, c = dict(), dict(), dict()
+    for k in busy:
+        end_k = s[k] + durations[k]
+        end_low, end_high = windows[k][0] + durations[k], windows[k][1] + durations[k]
+        # inside[k] == 0 означает, что окончание k лежит вне (peak_start, peak_end):
+        # before[k] == 1 — не позже peak_start, before[k] == 0 — не раньше peak_end
+        inside[k] = LpVariable(f"inside_{k}", cat=LpBinary)
+        before[k] = LpVariable(f"before_{k}", cat=LpBinary)
+        prob += end_k <= peak_start + (inside[k] + 1 - before[k]) * max(end_high - first, 0), f"end_before_{k}"
+        prob += end_k >= peak_end - (inside[k] + before[k]) * max(last + 1 - end_low, 0), f"end_after_{k}"
+        prob += inside[k] + before[k] <= 1, f"end_position_{k}"
+
+        # Процесс-предок k закончится до начала k и не может выполняться в момент его окончания,
+        # как и процесс, окно которого не пересекается с возможными моментами окончания k
+        candidates = [i for i in busy if i != k and i not in ancestors[k]
+                      and windows[i][0] <= end_high and windows[i][1] + durations[i] > end_low]
+        for i in candidates:
+            c[i, k] = LpVariable(f"c_{i}_{k}", cat=LpBinary)
+            prob += s[i] <= end_k + (1 - c[i, k]) * max(windows[i][1] - end_low, 0), f"over_start_{i}_{k}"
+            prob += (s[i] + durations[i] >= end_k + 1
+                     - (1 - c[i, k]) * max(end_high + 1 - windows[i][0] - durations[i], 0)), f"over_end_{i}_{k}"
+            prob += c[i, k] <= inside[k], f"over_used_{i}_{k}"
+        for i in candidates:
+            for j in ancestors[i]:
+                if (j, k) in c:
+                    prob += c[i, k] + c[j, k] <= 1, f"over_chain_{j}_{i}_{k}"
+        prob += lpSum(c[i, k] for i in candidates) >= peak * inside[k], f"peak_at_end_{k}"
+
+    start, duration = incumbent
+    if duration == 0:
+        start = peak_start.value()
+    if starts is not None and start is not None:
+        peak_start.setInitialValue(start)
+        peak_end.setInitialValue(start + duration)
+        peak_duration.setInitialValue(duration)
+        has_peak.setInitialValue(int(duration > 0))
+        for k in busy:
+            end_k = starts[k] + durations[k]
+            inside[k].setInitialValue(int(start < end_k < start + duration))
+            before[k].setInitialValue(int(end_k <= start))
+        for (i, k), variable in c.items():
+            end_k = starts[k] + durations[k]
+            running = starts[i] <= end_k < starts[i] + durations[i]
+            variable.setInitialValue(int(start < end_k < start + duration and running))
+    return peak_duration
+
+
+# Общий делитель длительностей и горизонта. Оптимальное расписание для задач о пике можно
+# искать среди вершин системы разностных ограничений s[i] - s[j] >= d_j, 0 <= s[i] <= H - d_i,
+# а координаты вершин — суммы её констант, поэтому все моменты кратны делителю,
+# и задача точно решается в единицах делителя
+def time_scale(processes, time_limit):
+    return reduce(gcd, (processes[i][1] for i in processes), time_limit) or 1
+
+
+def scale_processes(processes, scale):
+    return {i: [i, processes[i][1] // scale, processes[i][2], 0, 0] for i in processes}
+
+
+# Грубое расписание для больших горизонтов модели по моментам времени: задача решается
+# при шкале, сжатой в factor раз (длительности округляются, ненулевые — не меньше 1),
+# расписание переносится на исходную шкалу с соблюдением зависимостей и уточняется точной
+# моделью, в которой начало каждого процесса ограничено окрестностью ±factor грубого.
+# Результат — допустимое расписание для warm start точного решения (или None)
+def coarse_to_fine(processes, time_limit, windows, peak, resolution=50, threads=None, time_budget=None,
+                   profile=None, graph=None):
+    if graph is None:
+        graph = ProcessGraph(processes)
+    factor = -(-time_limit // resolution)
+    coarse = {i: [i, max(1, round(processes[i][1] / factor)) if processes[i][1] > 0 else 0,
+                  processes[i][2], 0, 0] for i in processes}
+    coarse_graph = graph.with_durations(coarse[i][1] for i in graph.ids)
+    coarse_limit = max(-(-time_limit // factor), coarse_graph.makespan)
+    coarse_windows, _ = presolve(coarse_graph, coarse_limit)
+    coarse_starts, _, _ = maximize_peak_duration(coarse, coarse_limit, peak, 'time', coarse_windows,
+                                                 threads, time_budget, profile=profile)
+    if coarse_starts is None:
+        return None
+
+    starts = dict()
+    for v in graph.order:
+        i = graph.ids[v]
+        start = max([windows[i][0], min(windows[i][1], coarse_starts[i] * factor)]
+                    + [starts[j] + processes[j][1] for j in processes[i][2]])
+        if start > windows[i][1]:
+            return None
+        starts[i] = start
+    narrow = {i: (max(windows[i][0], starts[i] - factor), min(windows[i][1], starts[i] + factor))
+              for i in processes}
+    refined, _, _ = maximize_peak_duration(processes, time_limit, peak, 'time', narrow,
+                                           threads, time_budget, starts, profile)
+    return refined or starts
+
+
+# Задача 3 (peak задан) или 10 (peak ищется) при горизонте time_limit без ручного
+# масштабирования: длительности и горизонт делятся на общий делитель, а если модель
+# по моментам времени всё ещё длиннее resolution, точное решение той же модели начинается
+# с расписания coarse_to_fine (выбранная модель не подменяется). Точная модель по моментам
+# времени всё равно растёт с длиной шкалы, поэтому на такой шкале она — только перепроверка
+# модели по событиям на небольших вариантах.
+# Пик находит exact_peak без MILP; MILP решается только для длительности пика и начинается
+# с лучшего из расписаний antichain_schedule, coarse_to_fine и initial (например, оптимального
+# для меньшего горизонта) — пик проверяется MILP в maximize_peak_parallelism.
+# graph — ProcessGraph тех же процессов: его строят один раз для всех горизонтов.
+# Возвращает пик, расписание, длительность пика в исходных единицах и признак оптимальности
+# (False, если CBC остановлен по time_budget)
+def solve_peak(processes, time_limit, formulation='events', peak=None, threads=None, time_budget=None,
+               resolution=50, profile=None, results=None, initial=None, graph=None):
+    if results is not None and time_budget is None:
+        return cached_peak(results, processes, time_limit, formulation, peak, threads, resolution, profile,
+                           initial, graph)
+    if graph is None:
+        graph = ProcessGraph(processes)
+    scale = time_scale(processes, time_limit)
+    if scale > 1:
+        if initial is not None:
+            initial = ({i: start // scale for i, start in initial.items()}
+                       if all(start % scale == 0 for start in initial.values()) else None)
+        if formulation == 'events':
+            # Предки вычисляются на исходном графе, чтобы их разделяли графы всех масштабов
+            graph.ancestors()
+        found_peak, start_times, duration, optimal = solve_peak(
+            scale_processes(processes, scale), time_limit // scale, formulation, peak, threads, time_budget,
+            resolution, profile, initial=initial, graph=graph.with_durations(d // scale for d in graph.durations))
+        if start_times is None:
+            return found_peak, None, None, False
+        return found_peak, {i: start * scale for i, start in start_times.items()}, duration * scale, optimal
+    with phase(profile, 'presolve'):
+        windows, _ = presolve(graph, time_limit)
+    with phase(profile, 'antichain'):
+        reach = reachability(graph)
+        found_peak, moment, antichain = exact_peak(graph, time_limit, reach)
+    if peak is None and found_peak == 0:
+        # Все длительности нулевые: ни в один момент не выполняется ни один процесс
+        return 0, dict(zip(graph.ids, graph.starts)), 0, True
+    if peak is None:
+        peak = found_peak
+    elif peak > found_peak:
+        # peak процессов одновременно не выполняются ни в одном расписании
+        return peak, dict(zip(graph.ids, graph.starts)), 0, True
+    candidates = [antichain_schedule(graph, time_limit, moment, antichain, reach)]
+    if initial is not None:
+        candidates.append(initial)
+    if formulation == 'time' and time_limit > resolution:
+        candidates.append(coarse_to_fine(processes, time_limit, windows, peak, resolution, threads, time_budget,
+                                         profile, graph))
+    initial = max((starts for starts in candidates if starts is not None),
+                  key=lambda starts: incumbent_run(processes, starts, peak)[1])
+    start_times, duration, optimal = maximize_peak_duration(processes, time_limit, peak, formulation, windows,
+                                                            threads, time_budget, initial, profile, graph)
+    return peak, start_times, duration, optimal
+
+
+# solve_peak с кэшем результатов results. Оптимум не зависит от модели, поэтому ключ — граф,
+# горизонт и peak. Ответ задачи 10 (пик P и его длительность) подходит и задаче 3 с тем же
+# горизонтом: при N = P длительность та же, а при N > P равна 0.
+# Решения с ограничением времени могут быть неоптимальными и в кэш не попадают
+def cached_peak(results, processes, time_limit, formulation, peak, threads, resolution, profile, initial=None,
+                graph=None):
+    key = ['peak', fingerprint(processes), time_limit]
+    for known_peak in ([peak, None] if peak is not None else [None]):
+        known = results.get(key + [known_peak])
+        if known is None or peak is not None and peak < known['peak']:
+            continue
+        start_times = {int(i): start for i, start in known['start_times'].items()}
+        if peak is None or peak == known['peak']:
+            return known['peak'], start_times, known['duration'], True
+        return peak, start_times, 0, True
+    found_peak, start_times, duration, optimal = solve_peak(processes, time_limit, formulation, peak, threads,
+                                                            None, resolution, profile, initial=initial, graph=graph)
+    if optimal:
+        results.put(key + [peak], {'peak': found_peak, 'start_times': start_times, 'duration': duration})
+    return found_peak, start_times, duration, optimal
+
+
+# Достижимость по зависимостям: reach[v] — битовая маска всех потомков процесса v
+def reachability(graph: ProcessGraph):
+    succ_ptr, succ_idx = graph.succ_ptr, graph.succ_idx
+    reach = [0] * len(graph.ids)
+    for v in reversed(graph.order):
+        mask = 0
+        for k in range(succ_ptr[v], succ_ptr[v + 1]):
+            w = succ_idx[k]
+            mask |= reach[w] | 1 << w
+        reach[v] = mask
+    return reach
+
+
+# Наибольшая антицепь (множество попарно независимых процессов) среди members.
+# По теореме Дилуорса её размер равен |members| минус наибольшее паросочетание в двудольном
+# графе «процесс — его потомок», а сама антицепь находится по теореме Кёнига: процессы,
+# достижимые чередующимися путями из непокрытых слева и не достижимые справа.
+# Паросочетание строится поиском увеличивающих путей в ширину над битовыми масками
+def max_antichain(reach, members):
+    mask = 0
+    for v in members:
+        mask |= 1 << v
+    match_left = dict()
+    match_right = dict()
+    for u in members:
+        parent = dict()
+        seen = 0
+        queue = [u]
+        found = None
+        while queue and found is None:
+            following = []
+            for x in queue:
+                free = reach[x] & mask & ~seen
+                seen |= free
+                while free:
+                    low = free & -free
+                    free ^= low
+                    w = low.bit_length() - 1
+                    parent[w] = x
+                    if w not in match_right:
+                        found = w
+                        break
+                    following.append(match_right[w])
+                if found is not None:
+                    break
+            queue = following
+        # Чередование вдоль найденного пути увеличивает паросочетание на 1
+        w = found
+        while w is not None:
+            x = parent[w]
+            previous = match_left.get(x)
+            match_left[x] = w
+            match_right[w] = x
+            w = previous
+
+    # Чередующиеся пути из непокрытых слева вершин
+    left = {u for u in members if u not in match_left}
+    right = 0
+    queue = list(left)
+    while queue:
+        following = []
+        for x in queue:
+            free = reach[x] & mask & ~right
+            right |= free
+            while free:
+                low = free & -free
+                free ^= low
+                u = match_right[low.bit_length() - 1]
+                if u not in left:
+                    left.add(u)
+                    following.append(u)
+        queue = following
+    return [v for v in members if v in left and not right >> v & 1]
+
+
+# Точный пик при горизонте time_limit без MILP. Процесс i может выполняться в момент t
+# тогда и только тогда, когда ES_i <= t < LF_i (окно из presolve плюс длительность),
+# а множество процессов может выполняться одновременно в момент t тогда и только тогда,
+# когда все их окна содержат t и никакой из них не зависит (даже через другие процессы)
+# от другого: такое расписание строит antichain_schedule. Поэтому пик — наибольшая
+# антицепь среди процессов, окна которых содержат t, по всем моментам t. Достаточно
+# проверить отрезки постоянства набора окон (concurrency_profile окон), начиная
+# с наибольших, пока набор не станет меньше найденной антицепи; от величины
+# длительностей время не зависит.
+# Возвращает (пик, момент пика, индексы процессов пика)
+def exact_peak(graph: ProcessGraph, time_limit, reach=None):
+    last_times = graph.latest_finishes(time_limit)
+    spans = {v: [v, last_times[v] - graph.starts[v]] for v in range(len(graph.ids)) if graph.durations[v] > 0}
+    moments, counts = concurrency_profile(spans, {v: graph.starts[v] for v in spans})
+    if reach is None:
+        reach = reachability(graph)
+    best = (0, None, [])
+    for k in sorted(range(len(counts)), key=counts.__getitem__, reverse=True):
+        if counts[k] <= best[0]:
+            break
+        moment = moments[k]
+        members = [v for v in spans if graph.starts[v] <= moment < last_times[v]]
+        antichain = max_antichain(reach, members)
+        if len(antichain) > best[0]:
+            best = (len(antichain), moment, antichain)
+    return best
+
+
+# Расписание, в котором процессы antichain выполняются в момент moment: они заканчиваются
+# как можно раньше после moment, их потомки начинаются как можно позже, остальные — как
+# можно раньше. Возвращает начала процессов по id (или None, если пика нет)
+def antichain_schedule(graph: ProcessGraph, time_limit, moment, antichain, reach=None):
+    if moment is None:
+        return None
+    if reach is None:
+        reach = reachability(graph)
+    last_times = graph.latest_finishes(time_limit)
+    members = set(antichain)
+    descendants = 0
+    for v in antichain:
+        descendants |= reach[v]
+    starts = dict()
+    for v, i in enumerate(graph.ids):
+        if v in members:
+            starts[i] = max(graph.starts[v], moment + 1 - graph.durations[v])
+        elif descendants >> v & 1:
+            starts[i] = last_times[v] - graph.durations[v]
+        else:
+            starts[i] = graph.starts[v]
+    return starts
+
+
+# Горизонт, дальше которого ответ задач 3 и 10 не растёт: отрезки, на которых не выполняется
+# ни один процесс, можно вырезать из любого расписания без изменения пересечений процессов,
+# поэтому оптимальное расписание укладывается в сумму длительностей
+def horizon_limit(graph: ProcessGraph):
+    return max(graph.makespan, sum(graph.durations))
+
+
+# Горизонт, при котором возможен любой достижимый пик длительности duration. Пусть в каком-то
+# расписании на отрезке [a, a + duration) выполняются не менее N процессов. Процессы, пересекающие
+# отрезок, сохраняют положение относительно него, их предки начинаются как можно раньше, потомки —
+# сразу после завершения предшественников. Начало отрезка при этом не больше max(ES_j + d_j) - 1,
+# а процессы, пересекающие его, заканчиваются вместе с потомками не позже чем через
+# (duration - 1) + makespan, так что всё расписание укладывается в 2 * makespan + duration - 2
+# (и в horizon_limit). Если при горизонте H оптимальная длительность D и
+# H >= certifying_horizon(graph, D + 1), пик длиннее D невозможен ни при каком горизонте
+def certifying_horizon(graph: ProcessGraph, duration):
+    if duration <= 0:
+        return graph.makespan
+    return min(horizon_limit(graph), max(graph.makespan, 2 * graph.makespan + duration - 2))
+
+
+# Оценки сверху, не зависящие от горизонта: пик не больше наибольшей антицепи процессов
+# ненулевой длительности (при горизонте horizon_limit она достигается),
+# а длительность пика — суммарной длительности, делённой на пик
+def peak_upper_bound(graph: ProcessGraph):
+    return exact_peak(graph, horizon_limit(graph))[0]
+
+
+def peak_duration_upper_bound(graph: ProcessGraph, peak):
+    if peak <= 0:
+        return horizon_limit(graph)
+    return sum(graph.durations) // peak
+
+
+# Автоматический подбор горизонта для задач 3 и 10 вместо коэффициента, вводимого вручную.
+# Первый горизонт — наименьший, при котором N процессов (в задаче 10 — наибольший возможный пик)
+# могут выполняться одновременно. Решение для горизонта H с длительностью пика D доказано
+# оптимальным, если CBC доказал оптимум и H >= certifying_horizon(graph, D + 1) или D равна
+# оценке сверху; иначе следующий горизонт — certifying_horizon(graph, D + 1), при growth —
+# не больше H * growth. Каждый горизонт начинается с лучшего расписания предыдущих.
+# Перебор останавливается без доказательства, если решение упёрлось в time_budget
+# или горизонт достиг max_horizon.
+# workers > 1 — несколько горизонтов (для D + 1, D + 2, ...) решаются одновременно в отдельных процессах.
+# graph — уже построенный ProcessGraph тех же процессов (общий для всех горизонтов).
+# Возвращает словарь с ответом, наименьшим горизонтом, на котором он получен, и признаком certified
+def find_horizon(processes, formulation='events', peak=None, growth=None, max_horizon=None, workers=1,
+                 threads=None, time_budget=None, verbose=False, profile=None, results=None, graph=None):
+    from concurrent.futures import ProcessPoolExecutor
+    if graph is None:
+        graph = ProcessGraph(processes)
+    if peak is not None and peak <= 0:
+        raise ValueError('Количество процессов должно быть положительным')
+    peak_bound = peak_upper_bound(graph)
+    level = peak_bound if peak is None else peak
+    if level > peak_bound or level == 0:
+        # Столько процессов одновременно не выполняются ни в одном расписании
+        return {
+            'peak': level,
+            'start_times': dict(zip(graph.ids, graph.starts)),
+            'duration': 0,
+            'horizon': graph.makespan,
+            'certified': True,
+        }
+    duration_bound = peak_duration_upper_bound(graph, level)
+    scale = reduce(gcd, graph.durations, 0) or 1
+    limit = certifying_horizon(graph, duration_bound)
+    if max_horizon is not None:
+        limit = max(min(limit, max_horizon), graph.makespan)
+
+    def rounded(horizon):
+        # Горизонты кратны общему делителю длительностей, чтобы solve_peak мог сжать шкалу
+        return min(limit, -(-horizon // scale) * scale)
+
+    def key(result):
+        found_peak, _, duration, _ = result
+        return (found_peak if found_peak is not None else -1, duration if duration is not None else -1)
+
+    def proven(time_limit, result):
+        found_peak, _, duration, optimal = result
+        if not optimal or found_peak < level:
+            return False
+        return duration >= duration_bound or time_limit >= certifying_horizon(graph, duration + 1)
+
+    low, high = graph.makespan, limit
+    while low < high:
+        middle = (low + high) // 2
+        if exact_peak(graph, middle)[0] >= level:
+            high = middle
+        else:
+            low = middle + 1
+    batch = [rounded(low)]
+
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    best = None
+    certified = False
+    try:
+        while batch:
+            initial = best[1][1] if best is not None else None
+            args = [(processes, h, formulation, peak, threads, time_budget) for h in batch]
+            if pool is None:
+                answers = []
+                for arg in args:
+                    with phase(profile, 'horizon', horizon=arg[1]):
+                        answers.append(solve_peak(*arg, profile=profile, results=results, initial=initial,
+                                                  graph=graph))
+            elif profile is None:
+                answers = list(pool.map(partial(solve_peak, results=results, initial=initial, graph=graph),
+                                        *zip(*args)))
+            else:
+                answers = []
+                for answer, record in pool.map(partial(_solve_peak_profiled, results=results, initial=initial,
+                                                       graph=graph), *zip(*args)):
+                    answers.append(answer)
+                    profile.merge(record)
+            stopped = False
+            for time_limit, result in zip(batch, answers):
+                if verbose:
+                    print(f'Горизонт {time_limit}: пик {result[0]}, длительность {result[2]}'
+                          + ('' if result[3] else ' (остановлено по ограничению времени)'))
+                if best is None or key(result) > key(best[1]):
+                    best = (time_limit, result)
+                if proven(time_limit, result):
+                    certified = True
+                    break
+                stopped = stopped or not result[3]
+            if certified or stopped:
+                break
+            last = batch[-1]
+            duration = best[1][2] or 0
+            batch = []
+            for extra in range(1, workers + 1):
+                horizon = certifying_horizon(graph, duration + extra)
+                if growth is not None:
+                    horizon = min(horizon, int(last * growth ** extra))
+                horizon = rounded(max(horizon, last + 1))
+                if horizon > (batch[-1] if batch else last):
+                    batch.append(horizon)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    time_limit, (found_peak, start_times, duration, _) = best
+    return {
+        'peak': found_peak,
+        'start_times': start_times,
+        'duration': duration,
+        'horizon': time_limit,
+        'certified': certified,
+    }
+
+
+# solve_peak в процессе пула find_horizon с собственным профилем: ответ и замеры
+def _solve_peak_profiled(processes, time_limit, *args, results=None, initial=None, graph=None):
+    with Profile() as profile:
+        with profile.phase('horizon', horizon=time_limit):
+            answer = solve_peak(processes, time_limit, *args, profile=profile, results=results, initial=initial,
+                                graph=graph)
+    return answer, profile.record()
+
+
+# Нахождение максимального количества процессов, которые завершатся за определенное время
+def maximum_on_time(graph: ProcessGraph, time_limit):
+    return sum(1 for finish in graph.finishes if finish <= time_limit)
+
+# Прямой проход сразу для K наборов длительностей: durations — матрица K × N, столбцы
+# в порядке graph.ids. Процессы обрабатываются по топологическим слоям операциями NumPy
+# сразу над всеми наборами; наборы делятся на части по chunk_size строк, поэтому рабочая
+# память не превышает chunk_size × (N + число зависимостей) чисел.
+# Возвращает словарь: makespan — минимальное время завершения всех процессов для каждого
+# набора, finished — для каждого набора и каждого T из times число процессов, завершившихся
+# к T (как maximum_on_time), и, если finishes=True, времена окончания всех процессов
+def what_if(graph: ProcessGraph, durations, times=(), lag=0, finishes=False, chunk_size=4096):
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError('Для пакетного расчёта установите numpy: pip install numpy')
+    n = len(graph.ids)
+    durations = np.asarray(durations, dtype=np.int64)
+    if durations.ndim != 2 or durations.shape[1] != n:
+        raise ValueError(f'Ожидается матрица длительностей K × {n}, получена {durations.shape}')
+    times = np.asarray(times, dtype=np.int64).reshape(-1)
+    # Для каждого слоя: процессы с зависимостями, их предшественники подряд и начала групп
+    plan = []
+    for layer in graph.layers():
+        heads, preds, offsets = [], [], []
+        for v in layer:
+            if graph.pred_ptr[v + 1] > graph.pred_ptr[v]:
+                heads.append(v)
+                offsets.append(len(preds))
+                preds.extend(graph.pred_idx[graph.pred_ptr[v]:graph.pred_ptr[v + 1]])
+        if heads:
+            plan.append((np.array(heads), np.array(preds), np.array(offsets)))
+    count = durations.shape[0]
+    result = {
+        'makespan': np.zeros(count, dtype=np.int64),
+        'finished': np.zeros((count, len(times)), dtype=np.int64),
+    }
+    if finishes:
+        result['finishes'] = np.zeros((count, n), dtype=np.int64)
+    for begin in range(0, count, chunk_size):
+        end = min(begin + chunk_size, count)
+        # Процессы без зависимостей начинаются в 0 и заканчиваются через свою длительность
+        finish = durations[begin:end].copy()
+        for heads, preds, offsets in plan:
+            start = np.maximum.reduceat(finish[:, preds], offsets, axis=1)
+            if lag:
+                start = np.where(start > 0, start + lag, 0)
+            finish[:, heads] += start
+        result['makespan'][begin:end] = finish.max(axis=1, initial=0)
+        for k, time_limit in enumerate(times):
+            result['finished'][begin:end, k] = np.count_nonzero(finish <= time_limit, axis=1)
+        if finishes:
+            result['finishes'][begin:end] = finish
+    return result
+
+
+def minimal_with_lag_for_dependent(graph: ProcessGraph, lag:int):
+    _, finishes = graph.forward(lag)
+    return max(finishes)
+
+# Время окончания процесса v растёт с длительностью t неизвестного процесса как
+# max(F_v, ES_t + t + L(t, v)), где F_v — окончание при t = 0, а L(t, v) — самый длинный
+# путь от окончания неизвестного процесса до окончания v. Поэтому обе задачи решаются
+# по одному проходу графа при t = 0 без перебора значений t: это граф загрузчика, в котором
+# длительность процесса graph.placeholder равна 0.
+# Если N процессов завершаются за T при любом t, возвращается None
+def maximal_t_for_N_processes_on_T(graph: ProcessGraph, N, T):
+    v_t = graph.index[graph.placeholder]
+    distances = graph.descendant_distances(v_t)
+    # Процессы, не зависящие от t, и наибольшие t, при которых успевают зависящие
+    fixed_amount = 0
+    thresholds = []
+    for v, finish in enumerate(graph.finishes):
+        if finish > T:
+            continue
+        if v in distances:
+            thresholds.append(T - graph.starts[v_t] - distances[v])
+        else:
+            fixed_amount += 1
+    needed = N - fixed_amount
+    if needed <= 0:
+        return None
+    if len(thresholds) < needed:
+        return 0
+    thresholds.sort(reverse=True)
+    return max(thresholds[needed - 1], 0)
+
+def minimal_t_for_all_on_T(graph: ProcessGraph, T):
+    v_t = graph.index[graph.placeholder]
+    if graph.makespan > T:
+        return 0
+    # Самый длинный путь от окончания неизвестного процесса до завершения всех процессов
+    tail = -graph.latest_finishes(0)[v_t]
+    return max(T - graph.starts[v_t] - tail, 0)
+
+def amount_with_oddity(graph: ProcessGraph, oddity):
+    amount = len([finish for finish in graph.finishes if finish % 2 == oddity])
     return amount
 
-def solver():
-    file = input('Введите имя файла(.txt):')
+# Задача 11: расписание, в котором все процессы начинаются как можно раньше (его строит
+# ProcessGraph), без MILP. Наибольшее число одновременно выполняющихся процессов и самый
+# длинный отрезок, на котором их не менее level (по умолчанию — наибольшее число),
+# а если задан moment — ещё и число процессов, выполняющихся в этот момент
+def earliest_concurrency(graph: ProcessGraph, level=None, moment=None):
+    if level is not None and level <= 0:
+        raise ValueError('Количество процессов должно быть положительным')
+    moments, counts = concurrency_profile({v: [v, d] for v, d in enumerate(graph.durations)},
+                                          dict(enumerate(graph.starts)))
+    peak = max(counts, default=0)
+    level = peak if level is None else level
+    start, duration = longest_at_level(moments, counts, level)
+    result = {'peak': peak, 'level': level, 'start': start, 'duration': duration}
+    if moment is not None:
+        result['running'] = running_at(moments, counts, moment)
+    return result
+
+
+# Предобработка с выводом отчёта для модели по моментам времени
+def presolve_report(graph, time_limit, formulation):
+    windows, stats = presolve(graph, time_limit)
+    print(f"Предобработка: закреплено процессов {stats['fixed']}", end='')
+    if formulation == 'time':
+        print(f", не создано переменных {stats['variables_removed']}"
+              f" и ограничений {stats['constraints_removed']}", end='')
+    print()
+    return windows
+
+
+# Вывод ответа задач 3 и 10 с подобранным горизонтом
+def report_horizon(result):
+    from pprint import pprint
+    print(f"Максимальная продолжительность {result['peak']} процессов:", result['duration'])
+    print(f"Горизонт: {result['horizon']}"
+          + ('' if result['certified'] else ' (оптимальность не доказана)'))
+    print('Время начала процессов:')
+    pprint(result['start_times'])
+
+
+def solver(cache=False, profile_file=None, results=None):
+    file = input('Введите имя файла(.txt, .csv, .xlsx):')
     print('Выберите тип задачи:')
     print('1) Найти максимальную продолжительность времени, в течение которого возможно одновременное \n'
           '   выполнение максимального количества процессов, при условии, что все независимые друг от \n'
@@ -380,73 +1663,524 @@ def solver():
     print('10) Найти максимальную продолжительность времени, в течение которого возможно одновременное \n'
           '   выполнение максимального количества процессов, при условии, что все независимые друг от \n'
           '   друга процессы могут выполняться параллельно(без ограничения минимального времени)')
+    print('11) Все процессы начинаются как можно раньше. Определить наибольшее количество одновременно \n'
+          '   выполняющихся процессов и наибольшую продолжительность выполнения не менее N процессов.')
 
-    type_of_task = int(input('Введите число 1..10:'))
-    if type_of_task not in [6, 8, 9]:
-        N, processes = parse_file(file)
-        critical_paths, time_limit = find_all_critical_paths(processes)
+    type_of_task = int(input('Введите число 1..11:'))
+    profile = Profile() if profile_file else None
+    try:
+        with phase(profile, 'load'):
+            graph = load_instance(file, cache)
+    except ValueError as error:
+        print('Ошибка в данных:', error)
+        return
+    if (graph.placeholder is not None) != (type_of_task in [6, 8, 9]):
+        print('Процесс с неизвестной длительностью t нужен в задачах 6, 8, 9 и только в них')
+        return
+    time_limit = graph.makespan
+    if type_of_task in MILP_TASKS:
+        # Словарь процессов нужен только моделям MILP; остальные задачи работают с графом
+        processes, _ = graph.to_processes()
+        formulation = 'time' if input('Выберите модель (1 - по моментам времени, '
+                                      '2 - по событиям, для больших длительностей) [2]:').strip() == '1' else 'events'
+        if formulation == 'time' and graph.makespan // time_scale(processes, graph.makespan) > 50:
+            print('Шкала времени длиннее 50 единиц: модель по моментам времени подходит только для '
+                  'перепроверки на небольших вариантах и может решаться долго; '
+                  'для ответа выберите модель по событиям')
+        threads = input('Число потоков CBC (пусто - по умолчанию):').strip()
+        threads = int(threads) if threads else None
+    if type_of_task in [3, 10]:
+        max_horizon = input('Наибольший горизонт (пусто - без ограничения):').strip()
+        max_horizon = int(max_horizon) if max_horizon else None
+        time_budget = input('Ограничение времени решения для одного горизонта, с '
+                            '(пусто - без ограничения):').strip()
+        time_budget = float(time_budget) if time_budget else None
     if type_of_task == 1:
-        peak = maximize_peak_parallelism(processes, time_limit)
-        start_times, duration = maximize_peak_duration(processes, time_limit, peak)
+        presolve_report(graph, time_limit, formulation)
+        peak, start_times, duration, _ = solve_peak(processes, time_limit, formulation, threads=threads,
+                                                    profile=profile, results=results, graph=graph)
         print("Максимальная продолжительность пика:", duration)
     elif type_of_task == 2:
         print('Минимальное время завершения всех процессов:', time_limit)
     elif type_of_task == 3:
         peak = int(input('Введите количество процессов:'))
-        coeff = float(input('Введите коэффициент для максимального времени\n'
-                            '(лучше начать от 1.0 и постепенно увеличивать до 2.0):'))
-        start_times, duration = maximize_peak_duration(processes, int(time_limit * coeff), peak)
-        print(f"Максимальная продолжительность {peak} процессов:", duration)
-        print('Время начала процессов:')
-        pprint(start_times)
+        if peak <= 0:
+            print('Количество процессов должно быть положительным')
+            return
+        result = find_horizon(processes, formulation, peak, max_horizon=max_horizon, threads=threads,
+                              time_budget=time_budget, verbose=True, profile=profile, results=results,
+                              graph=graph)
+        report_horizon(result)
     elif type_of_task == 4:
         time_limit = int(input('Введите время за которое должны завершиться процессы:'))
-        amount = maximum_on_time(processes, time_limit)
+        amount = maximum_on_time(graph, time_limit)
         print(f"Максимальное количество процессов за {time_limit}:", amount)
     elif type_of_task == 5:
         lag = int(input('Введите длительность задержки перед зависимым процессом:'))
         print(f'Минимальное время завершения всех процессов с '
-              f'задержкой {lag}: {minimal_with_lag_for_dependent(processes, lag)}')
+              f'задержкой {lag}: {minimal_with_lag_for_dependent(graph, lag)}')
     elif type_of_task == 6:
         # https://education.yandex.ru/ege/task/bc1a1196-41b4-47d0-9502-d9b70a7f227c
-        processes, t_row = parse_file_6(file)
         N = int(input('Введите число процессов, которое должно быть выполнено:'))
         T = int(input('Введите время за которое, эти процессы должны быть выполнены:'))
-        print(f'Максимальное время t:{maximal_t_for_N_processes_on_T(processes, N, T, t_row)}')
+        t = maximal_t_for_N_processes_on_T(graph, N, T)
+        if t is None:
+            print(f'{N} процессов завершаются за {T} мс при любом t')
+        else:
+            print(f'Максимальное время t:{t}')
     elif type_of_task == 7:
         oddity = int(input('Введите чётность(0 - чётное, 1 - нечётное):'))
-        amount = amount_with_oddity(processes, oddity)
+        amount = amount_with_oddity(graph, oddity)
         print(f'Количество процессов с четностью {oddity}: {amount}')
     elif type_of_task == 8:
         # https://education.yandex.ru/ege/task/b67b9e16-3668-4cc7-bc88-f83a27bc7031
-        processes, t_row = parse_file_6(file)
         T = int(input('Введите время за которое, эти процессы должны быть выполнены:'))
-        print(f'Минимальное время t:{minimal_t_for_all_on_T(processes, T, t_row)}')
+        print(f'Минимальное время t:{minimal_t_for_all_on_T(graph, T)}')
     elif type_of_task == 9:
         # https://education.yandex.ru/ege/task/5a8c943b-648e-4307-b8d5-a3586f660605
-        processes, t_row = parse_file_6(file)
-        N = len(processes.keys()) + 1
+        N = len(graph.ids)
         T = int(input('Введите время за которое, эти процессы должны быть выполнены:'))
-        print(f'Максимальное время t:{maximal_t_for_N_processes_on_T(processes, N, T, t_row)}')
+        print(f'Максимальное время t:{maximal_t_for_N_processes_on_T(graph, N, T)}')
     elif type_of_task == 10:
         # Иглин 4 пробник, файл 22_4.txt Максимальное время 9 для 6 процессов
-        coeff = float(input('Введите коэффициент для максимального времени\n'
-                            '(лучше начать от 1.0 и постепенно увеличивать до 2.0):'))
-        peak = maximize_peak_parallelism(processes, int(time_limit * coeff))
-        start_times, duration = maximize_peak_duration(processes, int(time_limit * coeff), peak)
-        print(f"Максимальная продолжительность {peak} процессов:", duration)
-        print('Время начала процессов:')
-        pprint(start_times)
+        result = find_horizon(processes, formulation, max_horizon=max_horizon, threads=threads,
+                              time_budget=time_budget, verbose=True, profile=profile, results=results,
+                              graph=graph)
+        report_horizon(result)
+    elif type_of_task == 11:
+        level = input('Введите количество процессов N (пусто - наибольшее):').strip()
+        if level and int(level) <= 0:
+            print('Количество процессов должно быть положительным')
+            return
+        moment = input('Введите момент времени T, чтобы узнать число выполняющихся в нём процессов '
+                       '(пусто - не нужно):').strip()
+        result = earliest_concurrency(graph, int(level) if level else None, int(moment) if moment else None)
+        print('Наибольшее количество одновременно выполняющихся процессов:', result['peak'])
+        print(f"Наибольшая продолжительность выполнения не менее {result['level']} процессов: "
+              f"{result['duration']}" + (f" (с момента {result['start']})" if result['duration'] else ''))
+        if 'running' in result:
+            print(f'Количество процессов, выполняющихся в момент {moment}:', result['running'])
+
+    if profile is not None:
+        profile.close()
+        write_profile(profile_file, {'file': file, 'task': type_of_task, **profile.record()})
+        print('Профиль записан в', 'stderr' if profile_file == '-' else profile_file)
+
+
+# Запись замеров одной строкой JSON в конец файла filename ('-' — в stderr)
+def write_profile(filename, record):
+    row = json.dumps(record, ensure_ascii=False) + '\n'
+    if filename == '-':
+        sys.stderr.write(row)
+        return
+    with open(filename, 'a', encoding='utf-8') as f:
+        f.write(row)
 
 
+# Решение одной задачи пакетного режима без диалога.
+# job — словарь {"file": имя файла, "task": тип задачи 1..11, "params": {...}} и, по желанию,
+# "cache": true для загрузки через кэш скомпилированного графа (см. load_instance); параметры
+# называются как в диалоге solver(): N, T, lag, oddity, formulation ('time'/'events'),
+# а также threads и time_budget для решателя CBC. Горизонт задач 3 и 10 подбирается
+# find_horizon (параметры growth, max_horizon, workers), если не задан коэффициент coeff.
+# "profile": true добавляет к результату замеры по этапам (см. Profile).
+# "results_cache": true (или каталог) включает кэш результатов ResultCache размером
+# "results_cache_size" МБ: ответ задачи 1, 3 или 10 берётся из кэша, если тот же граф с той же
+# задачей и теми же параметрами уже решался (задачи с time_budget не кэшируются)
+def run_job(job):
+    profile = Profile() if job.get('profile') else None
+    results = None
+    if job.get('results_cache'):
+        directory = job['results_cache'] if isinstance(job['results_cache'], str) else None
+        results = ResultCache(directory, int(job.get('results_cache_size', 256) * 2 ** 20))
+    try:
+        with phase(profile, 'load'):
+            graph = load_instance(job['file'], job.get('cache', False))
+        type_of_task = int(job['task'])
+        params = job.get('params', {})
+        key = None
+        # Остальные задачи решаются быстрее, чем вычисляется отпечаток графа для ключа
+        if results is not None and 'time_budget' not in params and type_of_task in MILP_TASKS:
+            key = task_key(graph_fingerprint(graph), type_of_task, params)
+        result = results.get(key) if key is not None else None
+        if result is not None:
+            # JSON хранит ключи словаря строками, а номера процессов — целые
+            if 'start_times' in result:
+                result['start_times'] = {int(i): start for i, start in result['start_times'].items()}
+            result['cached'] = True
+        else:
+            result = solve_job(graph, type_of_task, params, profile, results)
+            if key is not None:
+                results.put(key, result)
+    finally:
+        if profile is not None:
+            profile.close()
+    if profile is not None:
+        result['profile'] = profile.record()
+    return result
+
+
+# Отпечаток графа вместе с процессом неизвестной длительности
+def graph_fingerprint(graph: ProcessGraph):
+    processes, t_row = graph.to_processes()
+    if t_row is not None:
+        processes[t_row[0]] = t_row
+    return fingerprint(processes, graph.placeholder)
+
+
+# Ключ ответа задачи в кэше: отпечаток графа, тип задачи и параметры, кроме threads и workers,
+# которые на ответ не влияют. Числа, записанные строкой или с нулевой дробной частью
+# ("4", 4.0), приводятся к одному виду, чтобы одинаковые вопросы имели один ключ
+def task_key(graph_print, type_of_task, params):
+    return ['task', graph_print, int(type_of_task),
+            {name: param_key(param) for name, param in params.items() if name not in ('threads', 'workers')}]
+
+
+def param_key(param):
+    if isinstance(param, str):
+        try:
+            param = float(param)
+        except ValueError:
+            return param
+    if isinstance(param, float) and param.is_integer():
+        return int(param)
+    return param
+
+
+def solve_job(graph, type_of_task, params, profile=None, results=None):
+    formulation = params.get('formulation', 'events')
+    threads = params.get('threads')
+    time_budget = params.get('time_budget')
+    result = dict()
+    if (graph.placeholder is not None) != (type_of_task in [6, 8, 9]):
+        raise ValueError('Процесс с неизвестной длительностью t нужен в задачах 6, 8, 9 и только в них')
+    processes = graph.to_processes()[0] if type_of_task in MILP_TASKS else None
+    time_limit = graph.makespan
+    if type_of_task == 1 or type_of_task in [3, 10] and 'coeff' in params:
+        time_limit = int(time_limit * float(params.get('coeff', 1.0)))
+        if time_limit < graph.makespan:
+            raise ValueError(f'Горизонт {time_limit} (coeff = {params.get("coeff")}) меньше минимального '
+                             f'времени завершения всех процессов {graph.makespan}: coeff должен быть не меньше 1')
+        _, result['presolve'] = presolve(graph, time_limit)
+        result['horizon'] = time_limit
+    elif type_of_task in [3, 10]:
+        peak = int(params['N']) if type_of_task == 3 else None
+        result.update(find_horizon(processes, formulation, peak, params.get('growth'),
+                                   params.get('max_horizon'), params.get('workers', 1),
+                                   threads, time_budget, profile=profile, results=results, graph=graph))
+        if type_of_task == 10 and params.get('check'):
+            result['milp_peak'] = maximize_peak_parallelism(processes, result['horizon'], formulation,
+                                                            threads=threads, time_budget=time_budget,
+                                                            profile=profile, graph=graph)
+        return result
+    if type_of_task == 1:
+        result['peak'], _, result['duration'], result['optimal'] = solve_peak(
+            processes, time_limit, formulation, None, threads, time_budget, profile=profile, results=results,
+            graph=graph)
+    elif type_of_task == 2:
+        result['time'] = time_limit
+    elif type_of_task == 3:
+        result['peak'], result['start_times'], result['duration'], result['optimal'] = solve_peak(
+            processes, time_limit, formulation, int(params['N']), threads, time_budget, profile=profile,
+            results=results, graph=graph)
+    elif type_of_task == 4:
+        result['amount'] = maximum_on_time(graph, int(params['T']))
+    elif type_of_task == 5:
+        result['time'] = minimal_with_lag_for_dependent(graph, int(params['lag']))
+    elif type_of_task == 6:
+        result['t'] = maximal_t_for_N_processes_on_T(graph, int(params['N']), int(params['T']))
+    elif type_of_task == 7:
+        result['amount'] = amount_with_oddity(graph, int(params['oddity']))
+    elif type_of_task == 8:
+        result['t'] = minimal_t_for_all_on_T(graph, int(params['T']))
+    elif type_of_task == 9:
+        N = len(graph.ids)
+        result['t'] = maximal_t_for_N_processes_on_T(graph, N, int(params['T']))
+    elif type_of_task == 10:
+        result['peak'], result['start_times'], result['duration'], result['optimal'] = solve_peak(
+            processes, time_limit, formulation, None, threads, time_budget, profile=profile, results=results,
+            graph=graph)
+    elif type_of_task == 11:
+        result.update(earliest_concurrency(graph, int(params['N']) if 'N' in params else None,
+                                           int(params['T']) if 'T' in params else None))
+    else:
+        raise ValueError(f'Неизвестный тип задачи: {type_of_task}')
+    if type_of_task in [1, 10] and params.get('check'):
+        # Перепроверка пика, найденного exact_peak, моделью MILP
+        result['milp_peak'] = maximize_peak_parallelism(processes, time_limit, formulation, threads=threads,
+                                                        time_budget=time_budget, profile=profile, graph=graph)
+    return result
+
+
+# Выполнение задачи в отдельном процессе. Процесс становится лидером своей группы,
+# чтобы при превышении времени вместе с ним можно было завершить и запущенный CBC
+def _run_job_in_child(job, conn):
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    try:
+        conn.send({'status': 'ok', 'result': run_job(job)})
+    except Exception as error:
+        conn.send({'status': 'error', 'error': f'{type(error).__name__}: {error}'})
+    conn.close()
+
+
+def _kill_job(proc):
+    if hasattr(os, 'killpg'):
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    else:
+        proc.terminate()
+    proc.join()
+
+
+# Пакетное выполнение задач: не более workers задач одновременно, каждая в своём процессе.
+# Задача, не уложившаяся в timeout секунд, завершается принудительно и не задерживает
+# остальные. Результаты выдаются по мере готовности вместе с номером задачи в списке;
+# при прерывании (Ctrl-C) или закрытии генератора выполняющиеся задачи завершаются
+def run_batch(jobs, workers=None, timeout=None):
+    import multiprocessing.connection
+    workers = workers or os.cpu_count() or 1
+    pending = list(enumerate(jobs))[::-1]
+    running = dict()
+    try:
+        while pending or running:
+            while pending and len(running) < workers:
+                index, job = pending.pop()
+                receiver, sender = multiprocessing.Pipe(duplex=False)
+                proc = multiprocessing.Process(target=_run_job_in_child, args=(job, sender))
+                proc.start()
+                sender.close()
+                running[receiver] = (index, job, proc, time.monotonic())
+            now = time.monotonic()
+            wait_for = None
+            if timeout is not None:
+                wait_for = max(0, min(started + timeout - now for _, _, _, started in running.values()))
+            ready = multiprocessing.connection.wait(list(running), wait_for)
+            now = time.monotonic()
+            for receiver in list(running):
+                index, job, proc, started = running[receiver]
+                if receiver in ready:
+                    try:
+                        outcome = receiver.recv()
+                    except EOFError:
+                        outcome = {'status': 'error', 'error': f'процесс завершился с кодом {proc.exitcode}'}
+                    proc.join()
+                elif timeout is not None and now - started >= timeout:
+                    _kill_job(proc)
+                    outcome = {'status': 'timeout'}
+                else:
+                    continue
+                receiver.close()
+                del running[receiver]
+                outcome['seconds'] = round(now - started, 3)
+                yield {'index': index, 'file': job.get('file'), 'task': job.get('task'), **outcome}
+    finally:
+        # Задачи в своих группах процессов не получают Ctrl-C из терминала,
+        # поэтому при прерывании или закрытии генератора они завершаются здесь
+        for _, _, proc, _ in running.values():
+            _kill_job(proc)
+        for receiver in running:
+            receiver.close()
+
+
+# Задачи пакетного режима из файла JSON Lines; относительные пути к файлам
+# с данными отсчитываются от каталога этого файла
+def read_manifest(filename):
+    base = os.path.dirname(os.path.abspath(filename))
+    jobs = []
+    with open(filename, encoding='utf-8') as f:
+        for row in f:
+            if row.strip():
+                job = json.loads(row)
+                job['file'] = os.path.join(base, job['file'])
+                jobs.append(job)
+    return jobs
+
+
+MILP_TASKS = (1, 3, 10)
+
+
+# Сервер анализа: варианты загружаются один раз и остаются в памяти вместе с ответами,
+# поэтому повторные вопросы не платят за запуск Python, импорт PuLP и разбор файла.
+# Запрос — строка JSON как в пакетном режиме ({"file": ..., "task": ..., "params": {...}},
+# необязательный "id" возвращается в ответе), ответ — строка JSON с тем же "id".
+# Запросы одного соединения обрабатываются одновременно: задачи 1, 3, 10 решаются в пуле из
+# workers процессов, остальные — сразу, поэтому быстрые ответы не ждут решения MILP.
+# Файл перечитывается, если он изменился; ответов хранится не больше max_answers
+class AnalysisServer:
+    def __init__(self, workers=None, cache=False, results=None, max_answers=10000):
+        from concurrent.futures import ProcessPoolExecutor
+        self.pool = ProcessPoolExecutor(workers or os.cpu_count() or 1)
+        # Процессы пула создаются сразу, до открытия сокетов: иначе они унаследуют
+        # соединения клиентов и те не закроются
+        self.pool.submit(int).result()
+        self.cache = cache
+        self.results = results
+        self.max_answers = max_answers
+        self.graphs = dict()
+        self.answers = dict()
+        self.solving = dict()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    # Граф и его отпечаток для файла filename: из памяти, пока файл не изменился
+    def graph(self, filename):
+        path = os.path.abspath(filename)
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        known = self.graphs.get(path)
+        if known is None or known[0] != version:
+            graph = load_instance(path, self.cache)
+            known = (version, graph, graph_fingerprint(graph))
+            self.graphs[path] = known
+        return known[1], known[2]
+
+    def remember(self, key, result):
+        self.answers[key] = result
+        while len(self.answers) > self.max_answers:
+            del self.answers[next(iter(self.answers))]
+
+    async def answer(self, request):
+        import asyncio
+        graph, graph_print = self.graph(request['file'])
+        type_of_task = int(request['task'])
+        params = request.get('params', {})
+        if type_of_task not in MILP_TASKS:
+            return solve_job(graph, type_of_task, params)
+        # Ответы с ограничением времени могут быть неоптимальными и не запоминаются
+        if 'time_budget' in params:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.pool, solve_job, graph, type_of_task, params, None, self.results)
+        key = json.dumps(task_key(graph_print, type_of_task, params), sort_keys=True)
+        if key in self.answers:
+            result = self.answers.pop(key)
+            self.answers[key] = result
+            return {**result, 'cached': True}
+        # Одинаковые запросы, пришедшие во время решения, ждут одного и того же решения
+        future = self.solving.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(
+                self.pool, solve_job, graph, type_of_task, params, None, self.results)
+            self.solving[key] = future
+            try:
+                result = await future
+            finally:
+                del self.solving[key]
+            self.remember(key, result)
+            return result
+        return dict(await asyncio.shield(future))
+
+    async def respond(self, row, writer):
+        started = time.monotonic()
+        outcome = dict()
+        try:
+            request = json.loads(row)
+            outcome = {name: request[name] for name in ('id', 'file', 'task') if name in request}
+            outcome.update(status='ok', result=await self.answer(request))
+        except Exception as error:
+            outcome.update(status='error', error=f'{type(error).__name__}: {error}')
+        outcome['seconds'] = round(time.monotonic() - started, 3)
+        writer.write((json.dumps(outcome, ensure_ascii=False) + '\n').encode('utf-8'))
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        import asyncio
+        tasks = set()
+        try:
+            while row := await reader.readline():
+                if row.strip():
+                    task = asyncio.create_task(self.respond(row, writer))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            # Клиент закончил запросы, но ждёт ответов на уже отправленные
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+
+# Запуск сервера: address — порт на 127.0.0.1 (или host:port) либо путь к Unix-сокету
+def serve(address, workers=None, cache=False, results=None):
+    import asyncio
+    server = AnalysisServer(workers, cache, results)
+
+    async def run():
+        if os.sep in address or not address.rpartition(':')[2].isdigit():
+            listener = await asyncio.start_unix_server(server.handle, address)
+        else:
+            host, _, port = address.rpartition(':')
+            listener = await asyncio.start_server(server.handle, host or '127.0.0.1', int(port))
+        print('Сервер ожидает запросы:', address, file=sys.stderr)
+        async with listener:
+            await listener.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Решение задачи 22 ЕГЭ по информатике')
+    parser.add_argument('--batch', metavar='MANIFEST',
+                        help='файл JSON Lines с задачами {"file": ..., "task": ..., "params": {...}}')
+    parser.add_argument('--workers', type=int, default=None, help='число параллельных процессов')
+    parser.add_argument('--timeout', type=float, default=None, help='ограничение времени на задачу, с')
+    parser.add_argument('--output', default=None, help='файл для результатов (по умолчанию stdout)')
+    parser.add_argument('--cache', action='store_true',
+                        help='сохранять скомпилированный граф рядом с файлом данных (.s22) и читать его повторно')
+    parser.add_argument('--profile', nargs='?', const='-', metavar='FILE',
+                        help='замеры по этапам в формате JSON Lines (в FILE или stderr); в пакетном режиме '
+                             'добавляются к результату каждой задачи')
+    parser.add_argument('--results-cache', nargs='?', const=True, metavar='DIR',
+                        help='кэш результатов между запусками (по умолчанию в ~/.cache/solver22)')
+    parser.add_argument('--results-cache-size', type=float, default=256, metavar='MB',
+                        help='наибольший размер кэша результатов, МБ')
+    parser.add_argument('--serve', metavar='ADDRESS',
+                        help='режим сервера: порт на 127.0.0.1 (или HOST:PORT) либо путь к Unix-сокету; '
+                             'запросы и ответы — строки JSON, --workers — число процессов для MILP')
+    args = parser.parse_args()
+    if args.batch is None:
+        results = None
+        if args.results_cache:
+            results = ResultCache(args.results_cache if isinstance(args.results_cache, str) else None,
+                                  int(args.results_cache_size * 2 ** 20))
+        if args.serve is not None:
+            serve(args.serve, args.workers, args.cache, results)
+        else:
+            solver(args.cache, args.profile, results)
+        return
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        jobs = read_manifest(args.batch)
+        for job in jobs:
+            if args.cache:
+                job.setdefault('cache', True)
+            if args.profile:
+                job.setdefault('profile', True)
+            if args.results_cache:
+                job.setdefault('results_cache', args.results_cache)
+                job.setdefault('results_cache_size', args.results_cache_size)
+        for outcome in run_batch(jobs, args.workers, args.timeout):
+            out.write(json.dumps(outcome, ensure_ascii=False) + '\n')
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
 
-solver()
+if __name__ == '__main__':
+    main()
 
-# Не решаются задачи Шастина и PRO10EGE с большими значениями для временных
-# отрезков их можно попробовать решить уменьшив длительность в 100-1000 раз
-# и посмотреть, как будут располагаться процессы, а затем перейти к исходным.
+# Задачи Шастина и PRO10EGE с большими значениями для временных отрезков решаются
+# без ручного деления длительностей (см. solve_peak)
 # https://education.yandex.ru/ege/task/d4658b6e-671b-4165-8c34-d4607b247c2b
-# файл 22.txt с делением времени на 1000 и округлением для прикидки
+# файл 22.txt — данные этой задачи с делением времени на 1000 и округлением
 #
 # https://education.yandex.ru/ege/task/1b0cd2c9-047a-4644-91ce-8e1f38b23da9
 # https://education.yandex.ru/ege/task/250cf1cc-5326-4025-b07c-9f4862d5904e
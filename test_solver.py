@@ -0,0 +1,294 @@
+import os
+import random
+
+import pytest
+
+from solver import (ProcessGraph, load_instance, exact_peak, solve_peak, find_horizon, horizon_limit,
+                    maximal_t_for_N_processes_on_T, minimal_t_for_all_on_T, count_critical_paths,
+                    iter_critical_paths, CACHE_SUFFIX, what_if)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# Случайный граф из n процессов с id 1..n: процесс зависит от каждого предыдущего
+# с вероятностью 0.3, длительности 0..max_duration
+def random_processes(n, rng, max_duration=3):
+    processes = dict()
+    for i in range(1, n + 1):
+        deps = tuple(j for j in range(1, i) if rng.random() < 0.3)
+        processes[i] = [i, rng.randint(0, max_duration), deps, 0, 0]
+    return processes
+
+
+# Все допустимые расписания с горизонтом time_limit перебором начал в окнах [ES, LS]
+def all_schedules(processes, time_limit):
+    graph = ProcessGraph(processes)
+    last_times = graph.latest_finishes(time_limit)
+    order = [graph.ids[v] for v in graph.order]
+    starts = dict()
+
+    def place(k):
+        if k == len(order):
+            yield dict(starts)
+            return
+        p = order[k]
+        v = graph.index[p]
+        earliest = max([graph.starts[v]] + [starts[dep] + processes[dep][1] for dep in processes[p][2]])
+        for start in range(earliest, last_times[v] - graph.durations[v] + 1):
+            starts[p] = start
+            yield from place(k + 1)
+        del starts[p]
+
+    yield from place(0)
+
+
+# Число выполняющихся процессов в каждую единицу времени [t, t + 1)
+def coverage(processes, starts, time_limit):
+    return [sum(1 for p, start in starts.items() if start <= t < start + processes[p][1])
+            for t in range(time_limit)]
+
+
+# Самый длинный отрезок, на котором выполняется не менее level процессов
+def longest_run(counts, level):
+    best = run = 0
+    for count in counts:
+        run = run + 1 if count >= level else 0
+        best = max(best, run)
+    return best
+
+
+def brute_peak(processes, time_limit):
+    return max(max(coverage(processes, starts, time_limit), default=0)
+               for starts in all_schedules(processes, time_limit))
+
+
+def brute_peak_duration(processes, time_limit, level):
+    return max(longest_run(coverage(processes, starts, time_limit), level)
+               for starts in all_schedules(processes, time_limit))
+
+
+def random_instances(count, seed, slack=3):
+    rng = random.Random(seed)
+    instances = []
+    while len(instances) < count:
+        processes = random_processes(rng.randint(2, 6), rng)
+        makespan = ProcessGraph(processes).makespan
+        if makespan > 0:
+            instances.append((processes, makespan + rng.randint(0, slack)))
+    return instances
+
+
+# Ответы из README
+def test_readme_task_10():
+    pytest.importorskip('pulp')
+    processes, _ = load_instance(os.path.join(HERE, '22_4.txt')).to_processes()
+    result = find_horizon(processes)
+    assert (result['peak'], result['duration'], result['certified']) == (6, 9, True)
+
+
+def test_readme_task_3():
+    pytest.importorskip('pulp')
+    processes, _ = load_instance(os.path.join(HERE, '22st.txt')).to_processes()
+    result = find_horizon(processes, 'events', 4)
+    assert (result['duration'], result['certified']) == (16, True)
+
+
+def test_exact_peak_matches_brute_force():
+    for processes, time_limit in random_instances(40, seed=1):
+        peak, _, _ = exact_peak(ProcessGraph(processes), time_limit)
+        assert peak == brute_peak(processes, time_limit), (processes, time_limit)
+
+
+@pytest.mark.parametrize('formulation', ['events', 'time'])
+def test_peak_duration_matches_brute_force(formulation):
+    pytest.importorskip('pulp')
+    for processes, time_limit in random_instances(12, seed=2):
+        for level in range(1, 4):
+            found_peak, start_times, duration, optimal = solve_peak(processes, time_limit, formulation, level)
+            assert optimal
+            assert duration == brute_peak_duration(processes, time_limit, level), (processes, time_limit, level)
+            if duration:
+                assert longest_run(coverage(processes, start_times, time_limit), level) >= duration
+
+
+# Ответ find_horizon совпадает с перебором при горизонте horizon_limit, дальше которого ответ не растёт
+def test_find_horizon_matches_brute_force():
+    pytest.importorskip('pulp')
+    for processes, _ in random_instances(10, seed=3, slack=0):
+        if len(processes) > 5:
+            continue
+        limit = horizon_limit(ProcessGraph(processes))
+        for level in range(1, 4):
+            result = find_horizon(processes, 'events', level)
+            assert result['certified']
+            assert result['duration'] == brute_peak_duration(processes, limit, level), (processes, level)
+
+
+# Задачи 6, 8, 9 перебором t = 1, 2, ..., как до их параметрического решения:
+# число процессов, завершившихся к T, и время завершения всех процессов при длительности t
+def with_duration(processes, t_id, t):
+    return ProcessGraph({p: [p, t if p == t_id else process[1], process[2], 0, 0]
+                         for p, process in processes.items()})
+
+
+def scan_maximal_t(processes, t_id, N, T):
+    if sum(1 for finish in with_duration(processes, t_id, T + 1).finishes if finish <= T) >= N:
+        return None
+    t = 1
+    while sum(1 for finish in with_duration(processes, t_id, t).finishes if finish <= T) >= N:
+        t += 1
+    return t - 1
+
+
+def scan_minimal_t(processes, t_id, T):
+    t = 1
+    while with_duration(processes, t_id, t).makespan <= T:
+        t += 1
+    return t - 1
+
+
+def test_unknown_duration_matches_scan():
+    rng = random.Random(4)
+    for _ in range(200):
+        processes = random_processes(rng.randint(2, 8), rng, max_duration=5)
+        t_id = rng.choice(list(processes))
+        processes[t_id][1] = 0
+        graph = ProcessGraph(processes, t_id)
+        for T in range(graph.makespan, graph.makespan + 6):
+            assert minimal_t_for_all_on_T(graph, T) == scan_minimal_t(processes, t_id, T)
+            for N in range(1, len(processes) + 1):
+                assert (maximal_t_for_N_processes_on_T(graph, N, T)
+                        == scan_maximal_t(processes, t_id, N, T)), (processes, t_id, N, T)
+
+
+# Критичные цепочки перебором всех путей от процессов без зависимостей: цепочка критична,
+# если сумма длительностей на ней равна времени завершения всех процессов
+def brute_critical_paths(processes):
+    makespan = ProcessGraph(processes).makespan
+    successors = {p: [] for p in processes}
+    for p, process in processes.items():
+        for dep in process[2]:
+            successors[dep].append(p)
+    paths = []
+
+    def extend(path, length):
+        if length == makespan:
+            paths.append(path[::-1])
+        for p in successors[path[-1]]:
+            extend(path + [p], length + processes[p][1])
+
+    for p, process in processes.items():
+        if not process[2]:
+            extend([p], process[1])
+    return paths
+
+
+def test_critical_paths_match_brute_force():
+    rng = random.Random(5)
+    for _ in range(200):
+        processes = random_processes(rng.randint(1, 9), rng)
+        graph = ProcessGraph(processes)
+        expected = sorted(brute_critical_paths(processes))
+        paths = list(iter_critical_paths(graph))
+        assert sorted(paths) == expected, processes
+        assert count_critical_paths(graph) == len(expected)
+        for limit in range(1, len(expected) + 2):
+            assert list(iter_critical_paths(graph, limit)) == paths[:limit]
+
+
+# Цепочка из k ромбов: 2 ** k критичных цепочек считаются без перебора,
+# а limit останавливает перебор после первых цепочек
+def test_critical_paths_count_without_enumeration():
+    processes = {1: [1, 1, (), 0, 0]}
+    for k in range(60):
+        top, left, right, bottom = 3 * k + 1, 3 * k + 2, 3 * k + 3, 3 * k + 4
+        processes[left] = [left, 2, (top,), 0, 0]
+        processes[right] = [right, 2, (top,), 0, 0]
+        processes[bottom] = [bottom, 1, (left, right), 0, 0]
+    graph = ProcessGraph(processes)
+    assert count_critical_paths(graph) == 2 ** 60
+    assert len(list(iter_critical_paths(graph, limit=5))) == 5
+
+
+# Длинная цепочка перебирается без рекурсии
+def test_critical_paths_deep_chain():
+    n = 20000
+    graph = ProcessGraph({i: [i, 1, (i - 1,) if i > 1 else (), 0, 0] for i in range(1, n + 1)})
+    assert count_critical_paths(graph) == 1
+    assert list(iter_critical_paths(graph)) == [list(range(n, 0, -1))]
+
+
+def write_text(tmp_path, text, name='input.txt'):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+# Пустые строки, заголовок, лишние столбцы, пробелы в зависимостях и процесс t
+def test_load_instance_formats(tmp_path):
+    filename = write_text(tmp_path, 'ID процесса\tВремя\tID зависимостей\tКомментарий\n'
+                                    '\n'
+                                    '51\t4\t0\tначало\n'
+                                    '72\t3\t\n'
+                                    '\n'
+                                    '80\t5\t51; 72\t\n'
+                                    '90\tt\t 80 ;51 \n')
+    graph = load_instance(filename)
+    processes, t_row = graph.to_processes()
+    assert processes == {51: [51, 4, (), 0, 0], 72: [72, 3, (), 0, 0], 80: [80, 5, (51, 72), 0, 0]}
+    assert t_row == [90, 0, (80, 51), 0, 0]
+    assert graph.placeholder == 90
+    assert graph.makespan == 9
+
+    csv_graph = load_instance(write_text(tmp_path, 'id,d,deps\n51,4,0\n72,3,\n80,5,51;72\n', 'input.csv'))
+    assert csv_graph.to_processes()[0] == {51: [51, 4, (), 0, 0], 72: [72, 3, (), 0, 0],
+                                           80: [80, 5, (51, 72), 0, 0]}
+
+
+@pytest.mark.parametrize('text, message', [
+    ('1\t2\t0\n2\t3\t1\n1\t4\t0\n', ':3: повторный id 1 (впервые в строке 1)'),
+    ('1\t2\t0\n2\t3\t7\n', ':2: процесс 2 зависит от несуществующего процесса 7'),
+    ('1\t2\t0\n2\t3\t1;4\n3\t1\t2\n4\t5\t3\n', ':2: зависимости процессов содержат цикл 2 -> 4 -> 3 -> 2'),
+    ('1\t2\t0\n2\tx2\t1\n', ':2: длительность процесса 2 не целое число'),
+])
+def test_load_instance_errors(tmp_path, text, message):
+    filename = write_text(tmp_path, text)
+    with pytest.raises(ValueError) as error:
+        load_instance(filename)
+    assert str(error.value).startswith(filename + message)
+
+
+# Скомпилированный граф читается без разбора, а обрезанный файл кэша разбирается заново
+def test_load_instance_cache(tmp_path):
+    filename = write_text(tmp_path, '1\t2\t0\n2\t3\t1\n3\tt\t1\n')
+    graph = load_instance(filename, cache=True)
+    cache_file = filename + CACHE_SUFFIX
+    cached = load_instance(cache_file)
+    assert cached.to_processes() == graph.to_processes()
+    assert (cached.placeholder, cached.makespan) == (graph.placeholder, graph.makespan)
+
+    data = open(cache_file, 'rb').read()
+    with open(cache_file, 'wb') as f:
+        f.write(data[:len(data) // 2])
+    with pytest.raises(ValueError):
+        load_instance(cache_file)
+    assert load_instance(filename, cache=True).to_processes() == graph.to_processes()
+    assert open(cache_file, 'rb').read() == data
+
+
+# Пакетный расчёт по наборам длительностей совпадает с прямым проходом по каждому набору,
+# в том числе с задержкой перед зависимым процессом и при делении наборов на части
+@pytest.mark.parametrize('lag', [0, 2])
+def test_what_if_matches_forward(lag):
+    np = pytest.importorskip('numpy')
+    rng = random.Random(6)
+    for _ in range(30):
+        graph = ProcessGraph(random_processes(rng.randint(1, 12), rng, max_duration=6))
+        durations = np.array([[rng.randint(0, 6) for _ in graph.ids] for _ in range(10)])
+        times = [0, 3, 10, 20]
+        result = what_if(graph, durations, times, lag=lag, finishes=True, chunk_size=3)
+        for row, values in enumerate(durations):
+            _, finishes = graph.with_durations(values.tolist()).forward(lag)
+            assert result['finishes'][row].tolist() == finishes.tolist()
+            assert result['makespan'][row] == max(finishes)
+            assert result['finished'][row].tolist() == [sum(1 for f in finishes if f <= T) for T in times]